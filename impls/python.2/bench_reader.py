@@ -0,0 +1,52 @@
+"""Parse a generated 5 MB mal data file with the Arpeggio and fast readers."""
+
+import os
+import random
+import tempfile
+import time
+
+import reader
+
+SIZE = 5 * 1024 * 1024
+
+
+def record(rng: random.Random, i: int) -> str:
+    tags = " ".join(f":tag{rng.randrange(100)}" for _ in range(rng.randrange(1, 6)))
+    scores = " ".join(str(rng.randrange(-1000, 100000)) for _ in range(8))
+    return (
+        f'{{:id {i} :name "record \\"{i}\\"\\n" :active {rng.choice(["true", "false"])}'
+        f" :parent {rng.choice(['nil', str(i // 2)])} :tags [{tags}]"
+        f" :scores ({scores}) :next '(lookup {i + 1})}} ; record {i}\n"
+    )
+
+
+def generate(path: str) -> None:
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write("[\n")
+        i = 0
+        while f.tell() < SIZE:
+            f.write(record(rng, i))
+            i += 1
+        f.write("]\n")
+
+
+def measure(read, text: str):
+    start = time.perf_counter()
+    result = read(text)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.mal")
+        generate(path)
+        with open(path) as f:
+            text = f.read()
+    print(f"{len(text) / 1024 / 1024:.1f} MB, {text.count(chr(10))} lines")
+    arpeggio_time, arpeggio_tree = measure(reader.read, text)
+    fast_time, fast_tree = measure(reader.read_fast, text)
+    if arpeggio_tree != fast_tree:
+        raise SystemExit("the readers built different trees")
+    print(f"{'arpeggio':<12}{arpeggio_time:8.2f}s")
+    print(f"{'fast':<12}{fast_time:8.2f}s")
@@ -0,0 +1,21 @@
+"""Run the perf tests with the tree-walking evaluator and with --vm."""
+
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PERF = [os.path.join(HERE, "..", "tests", f"perf{i}.mal") for i in (1, 2, 3)]
+BACKENDS = (("tree-walker", ()), ("vm", ("--vm",)))
+
+
+def run(path: str, *flags: str) -> str:
+    cmd = [sys.executable, "-O", os.path.join(HERE, "stepA_mal.py"), *flags, path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+if __name__ == "__main__":
+    for path in PERF:
+        for backend, flags in BACKENDS:
+            print(f"{os.path.basename(path):<12}{backend:<13}{run(path, *flags)}")
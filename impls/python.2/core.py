@@ -1,5 +1,5 @@
 import time
-from typing import List, Union, Dict
+from typing import Any, List, Union, Dict
 
 import reader
 from mal_types import (
@@ -22,6 +22,7 @@ from mal_types import (
     MalNotImplementedException,
     MalIndexError,
 )
+from mal_types import to_key, from_key
 
 
 def prn(args: List[MalExpression]) -> MalNil:
@@ -49,13 +50,13 @@ def list_q(x: MalExpression) -> MalBoolean:
 
 def empty_q(x: MalExpression) -> MalBoolean:
     if sequential_q(x):
-        return MalBoolean(len(x.native()) == 0)
+        return MalBoolean(x.count() == 0)
     raise MalInvalidArgumentException(x, "not a list")
 
 
 def count(x: MalExpression) -> MalInt:
     if isinstance(x, MalList) or isinstance(x, MalVector):
-        return MalInt(len(x.native()))
+        return MalInt(x.count())
     elif isinstance(x, MalNil):
         return MalInt(0)
     raise MalInvalidArgumentException(x, "not a list")
@@ -128,15 +129,15 @@ def reset(atom: MalExpression, val: MalExpression) -> MalExpression:
 
 def cons(first: MalExpression, rest: MalExpression) -> MalExpression:
     assert isinstance(rest, MalList) or isinstance(rest, MalVector)
-    return MalList([first] + rest.native())
+    if isinstance(rest, MalVector):
+        rest = MalList(rest.native())
+    return rest.cons(first)
 
 
 def concat(args: List[MalExpression]) -> MalExpression:
-    result_list: List[MalExpression] = []
     for x in args:
         assert isinstance(x, MalList) or isinstance(x, MalVector)
-        result_list = result_list + x.native()
-    return MalList(result_list)
+    return MalList.concat(args)
 
 
 def not_(expr: MalExpression) -> MalExpression:
@@ -176,7 +177,7 @@ def map_(func: MalExpression, map_list: MalExpression) -> MalExpression:
     for i in range(len(map_list.native())):
         elem = map_list.native()[i]
         result_list.append(func.call([elem]))
-    return MalList(result_list)
+    return MalList.from_owned(result_list)
 
 
 def throw(exception: MalExpression) -> MalExpression:
@@ -234,30 +235,26 @@ def get(map: MalExpression, key: MalExpression) -> MalExpression:
         return MalNil()
     if not isinstance(map, MalHash_map):
         raise MalInvalidArgumentException(map, "not a hash map")
-    if key.native() in map.native():
-        return map.native()[key.native()]
+    if to_key(key) in map.native():
+        return map.native()[to_key(key)]
     else:
         return MalNil()
 
 
 def first(args: List[MalExpression]) -> MalExpression:
-    try:
-        if isinstance(args[0], MalNil):
-            return MalNil()
-        return args[0].native()[0]
-    except IndexError:
+    if isinstance(args[0], MalNil):
         return MalNil()
-    except TypeError:
-        raise MalInvalidArgumentException(args[0], "not a list")
+    if isinstance(args[0], MalList) or isinstance(args[0], MalVector):
+        return args[0].first()
+    raise MalInvalidArgumentException(args[0], "not a list")
 
 
 def rest(args: List[MalExpression]) -> MalExpression:
-    try:
-        if isinstance(args[0], MalNil):
-            return MalList([])
-        return MalList(args[0].native()[1:])
-    except TypeError:
-        raise MalInvalidArgumentException(args[0], "not a list or vector")
+    if isinstance(args[0], MalNil):
+        return MalList([])
+    if isinstance(args[0], MalList) or isinstance(args[0], MalVector):
+        return args[0].rest()
+    raise MalInvalidArgumentException(args[0], "not a list or vector")
 
 
 def vector_q(arg: MalExpression) -> MalExpression:
@@ -277,12 +274,12 @@ def vector(args: List[MalExpression]) -> MalExpression:
 
 
 def hash_map(args: List[MalExpression]) -> MalExpression:
-    assert len(args) % 2 == 0
-    map_ = {}  # type: Dict[str, MalExpression]
-    for i in range(0, len(args) - 1, 2):
-        assert isinstance(args[i], MalString)
-        map_[args[i].native()] = args[i + 1]
-    return MalHash_map(map_)
+    if len(args) % 2 != 0:
+        raise MalInvalidArgumentException(args[-1], "hash-map key without a value")
+    map_ = {}  # type: Dict[Any, MalExpression]
+    for i in range(0, len(args), 2):
+        map_[to_key(args[i])] = args[i + 1]
+    return MalHash_map.from_owned(map_)
 
 
 def assoc(args: List[MalExpression]) -> MalExpression:
@@ -292,11 +289,12 @@ def assoc(args: List[MalExpression]) -> MalExpression:
         return args[0]
     if not isinstance(args[0], MalHash_map):
         raise MalInvalidArgumentException(args[0], "not a hash map")
+    if len(args) % 2 == 0:
+        raise MalInvalidArgumentException(args[-1], "assoc key without a value")
     dict_a_copy: Dict[str, MalExpression] = args[0].native().copy()
-    dict_b: Dict[str, MalExpression] = hash_map(args[1:]).native()
-    for key in dict_b:
-        dict_a_copy[key] = dict_b[key]
-    return MalHash_map(dict_a_copy)
+    for i in range(1, len(args), 2):
+        dict_a_copy[to_key(args[i])] = args[i + 1]
+    return MalHash_map.from_owned(dict_a_copy)
 
 
 def contains_q(args: List[MalExpression]) -> MalExpression:
@@ -304,9 +302,7 @@ def contains_q(args: List[MalExpression]) -> MalExpression:
         raise MalInvalidArgumentException(MalNil(), "contains? requires two arguments")
     if not isinstance(args[0], MalHash_map):
         raise MalInvalidArgumentException(args[0], "not a hash-map")
-    if not isinstance(args[1], MalString):
-        return MalBoolean(False)
-    return MalBoolean(args[1].native() in args[0].native())
+    return MalBoolean(to_key(args[1]) in args[0].native())
 
 
 def keys(args: List[MalExpression]) -> MalExpression:
@@ -316,7 +312,7 @@ def keys(args: List[MalExpression]) -> MalExpression:
         )
     if not isinstance(args[0], MalHash_map):
         raise MalInvalidArgumentException(args[0], "not a hash map")
-    return MalList([MalString(x, is_already_encoded=True) for x in args[0].native()])
+    return MalList.from_owned([from_key(x) for x in args[0].native()])
 
 
 def vals(args: List[MalExpression]) -> MalExpression:
@@ -326,7 +322,7 @@ def vals(args: List[MalExpression]) -> MalExpression:
         )
     if not isinstance(args[0], MalHash_map):
         raise MalInvalidArgumentException(args[0], "not a hash map")
-    return MalList([args[0].native()[x] for x in args[0].native()])
+    return MalList.from_owned(list(args[0].native().values()))
 
 
 def dissoc(args: List[MalExpression]) -> MalExpression:
@@ -337,13 +333,9 @@ def dissoc(args: List[MalExpression]) -> MalExpression:
     if not isinstance(args[0], MalHash_map):
         raise MalInvalidArgumentException(args[0], "not a hash map")
     dict_a_copy: Dict[str, MalExpression] = args[0].native().copy()
-    list_b: List[MalExpression] = MalList(args[1:]).native()
-    for key in list_b:
-        try:
-            del dict_a_copy[key.unreadable_str()]
-        except KeyError:
-            pass
-    return MalHash_map(dict_a_copy)
+    for key in args[1:]:
+        dict_a_copy.pop(to_key(key), None)
+    return MalHash_map.from_owned(dict_a_copy)
 
 
 def swap(args: List[MalExpression]) -> MalExpression:
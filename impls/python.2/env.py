@@ -1,4 +1,4 @@
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Set, Tuple
 
 from mal_types import MalExpression, MalSymbol, MalList, MalUnknownSymbolException
 
@@ -18,7 +18,7 @@ class Env(object):
             for x in range(0, len(binds)):
                 assert isinstance(binds[x], MalSymbol)
                 if binds[x].native() == "&":
-                    self.set(str(binds[x + 1]), MalList(exprs[x:]))
+                    self.set(str(binds[x + 1]), MalList.from_owned(exprs[x:]))
                     break
                 else:
                     self.set(str(binds[x]), exprs[x])
@@ -36,13 +36,12 @@ class Env(object):
 
     def get(self, key: MalExpression) -> MalExpression:
         strkey = str(key)
-        if strkey in self._data:
-            return self._data[strkey]
-
-        location = self.find(key)
-        if location is None:
-            raise MalUnknownSymbolException(strkey)
-        return location.get(key)
+        env: Optional[Env] = self
+        while env is not None:
+            if strkey in env._data:
+                return env._data[strkey]
+            env = env._outer
+        raise MalUnknownSymbolException(strkey)
 
     def __repr__(self) -> str:
         env_str = "{"
@@ -50,3 +49,58 @@ class Env(object):
             env_str += str(d) + ": " + str(self._data[d]) + ", "
         env_str += "}"
         return f"environment: (data: {env_str} outer: {repr(self._outer) if self._outer is not None else 'None'})"
+
+
+class Scope(object):
+    """Compile-time view of one fn*/let*/catch* frame.
+
+    Each name bound in the scope gets a fixed slot, so a symbol can be
+    resolved once to (depth, slot) and read at run time by following the
+    outer link depth times. At run time the frame is a list holding the
+    outer frame (or the global Env) at index 0 and the values after it."""
+
+    def __init__(self, outer: Optional["Scope"], is_fn: bool = False) -> None:
+        self.outer = outer
+        self.is_fn = is_fn
+        self.names: Dict[str, int] = {}
+        # let* names that are allocated but not bound yet; code evaluated
+        # directly in the bindings skips them and sees the outer binding.
+        self.pending: Set[str] = set()
+        # Names that only a def! in the frame binds; their slot is empty
+        # until that def! runs, so a read falls back to the outer binding.
+        self.unset: Set[str] = set()
+
+    def define(self, name: str, by_def: bool = False) -> int:
+        if name not in self.names:
+            self.names[name] = len(self.names) + 1
+            if by_def:
+                self.unset.add(name)
+        return self.names[name]
+
+    def size(self) -> int:
+        return len(self.names) + 1
+
+    def resolve(self, name: str) -> Optional[Tuple[int, int]]:
+        locations, _ = self.resolve_all(name)
+        return locations[0] if locations else None
+
+    def resolve_all(self, name: str) -> Tuple[List[Tuple[int, int]], bool]:
+        """The (depth, slot) locations a read of name tries in order, and
+        whether the last of them is always bound.
+
+        Every other location may hold an empty slot at run time; when the
+        last one may be empty too, the read ends at the global Env."""
+        locations = []
+        scope: Optional[Scope] = self
+        depth = 0
+        in_closure = False
+        while scope is not None:
+            slot = scope.names.get(name)
+            if slot is not None and (in_closure or name not in scope.pending):
+                locations.append((depth, slot))
+                if name not in scope.unset:
+                    return locations, True
+            in_closure = in_closure or scope.is_fn
+            scope = scope.outer
+            depth += 1
+        return locations, False
@@ -1,7 +1,11 @@
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, List, Any, Tuple
 
 
 class MalExpression(object):
+    # Every value class declares __slots__: a mal program allocates these by
+    # the million and an instance dict would more than double their size.
+    __slots__ = ()
+
     def __init__(self):
         assert False  # cannot instantiate
 
@@ -22,8 +26,19 @@ class MalExpression(object):
         """Returns an unescaped/raw str. Defaults to being the same as readable_str."""
         return self.readable_str()
 
+    # Values compare and hash structurally, the way core.equal sees them, so
+    # they can be hash-map keys; atoms and functions keep identity. Hashes
+    # of collections are computed once and cached in their _hash slot.
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return object.__hash__(self)
+
 
 class MalString(MalExpression):
+    __slots__ = ("_value",)
+
     def __init__(
         self, input_value: str, is_already_encoded: bool = False, keyword: bool = False
     ) -> None:
@@ -59,24 +74,162 @@ class MalString(MalExpression):
     def is_keyword(self) -> bool:
         return len(self._value) > 1 and self._value[0] == "\u029e"
 
+    def __eq__(self, other) -> bool:
+        return type(other) is MalString and other._value == self._value
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+
+# Above this many chunks a lazily concatenated list merges neighbouring
+# chunks of similar size, which keeps first/rest/cons bounded for lists
+# that are consed onto or rotated forever.
+_MAX_CHUNKS = 32
+
 
 class MalList(MalExpression):
+    __slots__ = ("_values", "_chunks", "_count", "_hash")
+
     def __init__(self, values: List[MalExpression]) -> None:
         for x in values:
             assert isinstance(x, MalExpression)
         self._values = values
+        self._chunks = None
+        self._count = len(values)
+        self._hash = None
+
+    @classmethod
+    def from_owned(cls, values: List[MalExpression]) -> "MalList":
+        """Wrap a list the caller has just built, without checking or copying
+        it. The list belongs to the result and must not be changed after."""
+        result = cls.__new__(cls)
+        result._values = values
+        result._chunks = None
+        result._count = len(values)
+        result._hash = None
+        return result
+
+    @classmethod
+    def _from_chunks(
+        cls, chunks: List[Tuple[List[MalExpression], int]], count: int
+    ) -> "MalList":
+        """Build a list that is the concatenation of values[start:] for each
+        (values, start) chunk. The chunk lists are shared, never copied."""
+        result = cls.__new__(cls)
+        result._count = count
+        result._hash = None
+        if len(chunks) == 1 and chunks[0][1] == 0:
+            result._values, result._chunks = chunks[0][0], None
+        elif len(chunks) > _MAX_CHUNKS:
+            chunks = _compact(chunks)
+            if len(chunks) == 1 or len(chunks) > _MAX_CHUNKS // 2:
+                result._values, result._chunks = _flatten(chunks), None
+            else:
+                result._values, result._chunks = None, chunks
+        else:
+            result._values, result._chunks = (None, chunks) if chunks else ([], None)
+        return result
+
+    def chunks(self) -> List[Tuple[List[MalExpression], int]]:
+        if self._chunks is not None:
+            return self._chunks
+        return [(self._values, 0)] if self._values else []
 
     def readable_str(self) -> str:
-        return "(" + " ".join(map(lambda x: x.readable_str(), self._values)) + ")"
+        return "(" + " ".join(map(lambda x: x.readable_str(), self.native())) + ")"
 
     def unreadable_str(self) -> str:
-        return "(" + " ".join(map(lambda x: x.unreadable_str(), self._values)) + ")"
+        return "(" + " ".join(map(lambda x: x.unreadable_str(), self.native())) + ")"
 
     def native(self) -> List[MalExpression]:
+        if self._values is None:
+            self._values = _flatten(self._chunks)
+            self._chunks = None
         return self._values
 
+    def count(self) -> int:
+        return self._count
+
+    def first(self) -> "MalExpression":
+        if self._count == 0:
+            return MalNil()
+        values, start = self.chunks()[0]
+        return values[start]
+
+    def rest(self) -> "MalList":
+        chunks = self.chunks()
+        if not chunks:
+            return MalList([])
+        values, start = chunks[0]
+        head = [(values, start + 1)] if start + 1 < len(values) else []
+        return MalList._from_chunks(head + chunks[1:], self._count - 1)
+
+    def cons(self, first: "MalExpression") -> "MalList":
+        # Leading chunks no bigger than what is merged so far are merged into
+        # the new first chunk, like carrying in a binary counter, so repeated
+        # cons copies each element O(log n) times and keeps O(log n) chunks.
+        chunks = self.chunks()
+        size, i = 1, 0
+        while i < len(chunks) and len(chunks[i][0]) - chunks[i][1] <= size:
+            size += len(chunks[i][0]) - chunks[i][1]
+            i += 1
+        head = [first] + _flatten(chunks[:i]) if i else [first]
+        return MalList._from_chunks([(head, 0)] + chunks[i:], self._count + 1)
+
+    def __eq__(self, other) -> bool:
+        return _sequence_eq(self, other)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(tuple(self.native()))
+        return self._hash
+
+    @staticmethod
+    def concat(sequences: List["MalExpression"]) -> "MalList":
+        chunks: List[Tuple[List[MalExpression], int]] = []
+        count = 0
+        for x in sequences:
+            chunks.extend(x.chunks())
+            count += x.count()
+        return MalList._from_chunks(chunks, count)
+
+
+def _sequence_eq(a: MalExpression, b: MalExpression) -> bool:
+    if not (isinstance(b, MalList) or isinstance(b, MalVector)):
+        return False
+    return a.count() == b.count() and a.native() == b.native()
+
+
+def _flatten(chunks: List[Tuple[List[MalExpression], int]]) -> List[MalExpression]:
+    result: List[MalExpression] = []
+    for values, start in chunks:
+        result.extend(values[start:] if start else values)
+    return result
+
+
+def _compact(
+    chunks: List[Tuple[List[MalExpression], int]]
+) -> List[Tuple[List[MalExpression], int]]:
+    """Merge neighbouring chunks while neither is more than twice the size
+    of the other. A merged chunk is at least 1.5 times the size of either
+    part, so an element is copied O(log n) times however the list grows,
+    instead of every _MAX_CHUNKS conses."""
+    merged: List[Tuple[List[MalExpression], int]] = []
+    sizes: List[int] = []
+    for values, start in chunks:
+        merged.append((values, start))
+        sizes.append(len(values) - start)
+        while len(merged) > 1 and max(sizes[-2], sizes[-1]) <= 2 * min(sizes[-2], sizes[-1]):
+            right = merged.pop()
+            merged[-1] = (_flatten([merged[-1], right]), 0)
+            size = sizes.pop()
+            sizes[-1] += size
+    return merged
+
 
 class MalSymbol(MalExpression):
+    __slots__ = ("_value",)
+
     def __init__(self, value: str) -> None:
         assert type(value) is str
 
@@ -92,8 +245,15 @@ class MalSymbol(MalExpression):
     def native(self) -> str:
         return self._value
 
+    def __eq__(self, other) -> bool:
+        return type(other) is MalSymbol and other._value == self._value
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
 
 class MalException(Exception, MalExpression):
+    # Exceptions keep the instance dict BaseException always has.
     def __init__(self, value: MalExpression) -> None:
         self._value = value
 
@@ -138,6 +298,8 @@ class MalNotImplementedException(MalException):
 
 
 class MalFunctionCompiled(MalExpression):
+    __slots__ = ("_native_function", "_is_macro")
+
     def __init__(
         self, native_function: Callable[[List[MalExpression]], MalExpression]
     ) -> None:
@@ -162,6 +324,8 @@ class MalFunctionCompiled(MalExpression):
 
 
 class MalFunctionRaw(MalExpression):
+    __slots__ = ("_ast", "_params", "_env", "_native_function", "_is_macro")
+
     def __init__(
         self,
         fn: Callable[[List[MalExpression]], MalExpression],
@@ -200,10 +364,26 @@ class MalFunctionRaw(MalExpression):
         self._is_macro = True
 
 
+# MalInt(n) for _SMALL_INT_MIN <= n < _SMALL_INT_MAX returns a preallocated
+# instance; the cache is filled once the class exists.
+_SMALL_INT_MIN = -128
+_SMALL_INT_MAX = 1024
+_SMALL_INTS: Tuple["MalInt", ...] = ()
+
+
 class MalInt(MalExpression):
-    def __init__(self, value: int) -> None:
+    __slots__ = ("_value",)
+
+    def __new__(cls, value: int) -> "MalInt":
         assert type(value) is int
+        if _SMALL_INT_MIN <= value < _SMALL_INT_MAX and _SMALL_INTS:
+            return _SMALL_INTS[value - _SMALL_INT_MIN]
+        self = object.__new__(cls)
         self._value = value
+        return self
+
+    def __init__(self, value: int) -> None:
+        pass  # set up by __new__
 
     def readable_str(self) -> str:
         return str(self._value)
@@ -211,10 +391,32 @@ class MalInt(MalExpression):
     def native(self) -> int:
         return self._value
 
+    def __eq__(self, other) -> bool:
+        return type(other) is MalInt and other._value == self._value
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+
+_SMALL_INTS = tuple(MalInt(n) for n in range(_SMALL_INT_MIN, _SMALL_INT_MAX))
+
 
 class MalVector(MalExpression):
+    __slots__ = ("_values", "_hash")
+
     def __init__(self, values: List[MalExpression]) -> None:
+        for x in values:
+            assert isinstance(x, MalExpression)
         self._values = values
+        self._hash = None
+
+    @classmethod
+    def from_owned(cls, values: List[MalExpression]) -> "MalVector":
+        """Like MalList.from_owned."""
+        result = cls.__new__(cls)
+        result._values = values
+        result._hash = None
+        return result
 
     def readable_str(self) -> str:
         return "[" + " ".join(map(lambda x: x.readable_str(), self._values)) + "]"
@@ -225,30 +427,88 @@ class MalVector(MalExpression):
     def native(self) -> List[MalExpression]:
         return self._values
 
+    def chunks(self) -> List[Tuple[List[MalExpression], int]]:
+        return [(self._values, 0)] if self._values else []
+
+    def count(self) -> int:
+        return len(self._values)
+
+    def first(self) -> MalExpression:
+        return self._values[0] if self._values else MalNil()
+
+    def rest(self) -> MalList:
+        return MalList._from_chunks(self.chunks(), self.count()).rest()
+
+    def __eq__(self, other) -> bool:
+        return _sequence_eq(self, other)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(tuple(self._values))
+        return self._hash
+
 
 class MalHash_map(MalExpression):
+    __slots__ = ("_dict", "_hash")
+
     def __init__(self, values: Dict[str, MalExpression]) -> None:
         self._dict = values.copy()
+        self._hash = None
+
+    @classmethod
+    def from_owned(cls, values: Dict[Any, MalExpression]) -> "MalHash_map":
+        """Wrap a dict the caller has just built, keyed by to_key, without
+        copying it. The dict belongs to the result and must not be changed
+        after."""
+        result = cls.__new__(cls)
+        result._dict = values
+        result._hash = None
+        return result
 
     def readable_str(self) -> str:
         result_list: List[str] = []
         for x in self._dict:
-            result_list.append(MalString(x).readable_str())
+            result_list.append(from_key(x).readable_str())
             result_list.append(self._dict[x].readable_str())
         return "{" + " ".join(result_list) + "}"
 
     def unreadable_str(self) -> str:
         result_list: List[str] = []
         for x in self._dict:
-            result_list.append(MalString(x, is_already_encoded=True).unreadable_str())
+            result_list.append(from_key(x).unreadable_str())
             result_list.append(self._dict[x].unreadable_str())
         return "{" + " ".join(result_list) + "}"
 
     def native(self) -> Dict[str, MalExpression]:
         return self._dict
 
+    def __eq__(self, other) -> bool:
+        return isinstance(other, MalHash_map) and self._dict == other._dict
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._dict.items()))
+        return self._hash
+
+
+def to_key(key: MalExpression) -> Any:
+    """Return the dict key a hash-map uses for key: strings and keywords
+    are stored as their python str, any other value as itself."""
+    return key.native() if isinstance(key, MalString) else key
+
+
+def from_key(key: Any) -> MalExpression:
+    return MalString(key, is_already_encoded=True) if isinstance(key, str) else key
+
 
 class MalNil(MalExpression):
+    """There is a single nil: MalNil() always returns NIL."""
+
+    __slots__ = ()
+
+    def __new__(cls) -> "MalNil":
+        return NIL
+
     def __init__(self) -> None:
         pass
 
@@ -261,10 +521,26 @@ class MalNil(MalExpression):
     def native(self) -> None:
         return None
 
+    def __eq__(self, other) -> bool:
+        return type(other) is MalNil
+
+    def __hash__(self) -> int:
+        return hash(None)
+
+
+NIL = object.__new__(MalNil)
+
 
 class MalBoolean(MalExpression):
+    """MalBoolean(value) always returns one of TRUE and FALSE."""
+
+    __slots__ = ("_value",)
+
+    def __new__(cls, value: bool) -> "MalBoolean":
+        return TRUE if value else FALSE
+
     def __init__(self, value: bool) -> None:
-        self._value = value
+        pass  # TRUE and FALSE are set up once, below
 
     def readable_str(self) -> str:
         if self._value:
@@ -274,8 +550,26 @@ class MalBoolean(MalExpression):
     def native(self) -> bool:
         return self._value
 
+    def __eq__(self, other) -> bool:
+        return type(other) is MalBoolean and other._value == self._value
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+
+def _boolean(value: bool) -> MalBoolean:
+    result = object.__new__(MalBoolean)
+    result._value = value
+    return result
+
+
+TRUE = _boolean(True)
+FALSE = _boolean(False)
+
 
 class MalAtom(MalExpression):
+    __slots__ = ("_value",)
+
     def __init__(self, value: MalExpression) -> None:
         self._value = value
 
@@ -1,4 +1,6 @@
-from typing import Dict
+import functools
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
 from arpeggio import (  # type: ignore
     ParserPython,
@@ -17,7 +19,7 @@ from mal_types import (
     MalVector,
     MalHash_map,
 )
-from mal_types import MalSymbol, MalString, MalSyntaxException
+from mal_types import MalSymbol, MalString, MalSyntaxException, to_key
 
 
 # Arpeggio grammar
@@ -111,30 +113,7 @@ class ReadASTVisitor(PTNodeVisitor):
         val: str = node.value
         if len(val) < 2 or val[-1] != '"':
             raise MalSyntaxException("unbalanced string")
-        val = val[1:-1]  # remove outer quotes
-
-        # handle escaped characters
-        i = 0
-        result = ""
-        while i < len(val):
-            if val[i] == "\\":
-                if (i + 1) < len(val):
-                    if val[i + 1] == "n":
-                        result += "\n"
-                    elif val[i + 1] == "\\":
-                        result += "\\"
-                    elif val[i + 1] == '"':
-                        result += '"'
-                    i += 2
-                else:
-                    raise MalSyntaxException(
-                        "unbalanced string or invalid escape sequence"
-                    )
-            else:
-                result += val[i]
-                i += 1
-
-        return MalString(result)
+        return MalString(_unescape(val[1:-1]))  # remove outer quotes
 
     def visit_mKeyword(self, node, children) -> MalString:
         assert type(node.value) is str
@@ -142,18 +121,17 @@ class ReadASTVisitor(PTNodeVisitor):
         return MalString(node.value[1:], keyword=True)
 
     def visit_mList(self, node, children) -> MalList:
-        return MalList(children)
+        return MalList.from_owned(children)
 
     def visit_mVector(self, node, children) -> MalVector:
-        return MalVector(children)
+        return MalVector.from_owned(children)
 
     def visit_mHash_map(self, node, children):
         assert len(children) % 2 == 0
         dict = {}  # type: Dict[MalExpression, MalExpression]
         for i in range(0, len(children), 2):
-            assert isinstance(children[i], MalString)
-            dict[children[i].native()] = children[i + 1]
-        return MalHash_map(dict)
+            dict[to_key(children[i])] = children[i + 1]
+        return MalHash_map.from_owned(dict)
 
     def visit_mSymbol(self, node, children) -> MalSymbol:
         return MalSymbol(node.value)
@@ -169,33 +147,170 @@ class ReadASTVisitor(PTNodeVisitor):
         return MalNil()
 
     def visit_mQuotedExpression(self, node, children) -> MalList:
-        return MalList([MalSymbol("quote"), children[0]])
+        return MalList.from_owned([MalSymbol("quote"), children[0]])
 
     def visit_mQuasiQuotedExpression(self, node, children) -> MalList:
-        return MalList([MalSymbol("quasiquote"), children[0]])
+        return MalList.from_owned([MalSymbol("quasiquote"), children[0]])
 
     def visit_mSpliceUnquotedExpression(self, node, children) -> MalList:
-        return MalList([MalSymbol("splice-unquote"), children[0]])
+        return MalList.from_owned([MalSymbol("splice-unquote"), children[0]])
 
     def visit_mUnquotedExpression(self, node, children) -> MalList:
-        return MalList([MalSymbol("unquote"), children[0]])
+        return MalList.from_owned([MalSymbol("unquote"), children[0]])
 
     def visit_mDerefExpression(self, node, children) -> MalList:
-        return MalList([MalSymbol("deref"), children[0]])
+        return MalList.from_owned([MalSymbol("deref"), children[0]])
 
 
 def comment():
     return _(";.*")
 
 
+_ESCAPES = {"n": "\n", "\\": "\\", '"': '"'}
+
+
+def _unescape_match(match: "re.Match[str]") -> str:
+    if not match.group(1):
+        raise MalSyntaxException("unbalanced string or invalid escape sequence")
+    return _ESCAPES.get(match.group(1), "")  # unknown escapes are dropped
+
+
+def _unescape(val: str) -> str:
+    if "\\" not in val:
+        return val
+    return re.sub(r"\\(.?)", _unescape_match, val, flags=re.DOTALL)
+
+
+@functools.lru_cache(maxsize=None)
+def _parser() -> ParserPython:
+    return ParserPython(mExpression, comment_def=comment, ws="\t\n\r ,", debug=False)
+
+
+# When set, read uses read_fast instead of the Arpeggio grammar.
+use_fast_reader = False
+
+
 def read(x: str) -> MalExpression:
     """Parse a string into a MalExpression"""
-    reader = ParserPython(mExpression, comment_def=comment, ws="\t\n\r ,", debug=False)
+    if use_fast_reader:
+        return read_fast(x)
 
     try:
-        parsed = visit_parse_tree(reader.parse(x), ReadASTVisitor())
+        parsed = visit_parse_tree(_parser().parse(x), ReadASTVisitor())
         assert issubclass(type(parsed), MalExpression)
         return parsed
     except NoMatch as e:
         # print(str(e))
         raise MalSyntaxException("invalid syntax or unexpected EOF")
+
+
+# Whitespace and comments. This is matched on its own so that a failed
+# _TOKEN match cannot backtrack into a comment.
+_SKIP = re.compile(r"(?:[\t\n\r ,]+|;.*)*")
+
+# One token of the Arpeggio grammar above. The alternatives are tried in the
+# grammar's order, so for valid input read_fast builds the same trees as the
+# grammar. Errors differ on malformed input: where the grammar backtracks
+# into a partial parse of something like "~ (" or "@ (", read_fast raises.
+_TOKEN = re.compile(
+    r"""(?:(?P<open>[(\[{])|(?P<close>[)\]}])|(?P<macro>~@|['`~@])"""
+    r"""|(?P<int>-?[0123456789]+)|(?P<string>"(?:\\.|[^\\"])*"?)"""
+    r"""|(?P<keyword>:[^\s\[\]{}('"`,;)]*)|(?P<nil>nil(?!\?))"""
+    r"""|(?P<boolean>(?:true|false)(?!\?))|(?P<symbol>[^\s\[\]{}('"`,;)]+))"""
+)
+
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+
+_QUOTES = ("'", "`")
+
+_MACROS = {
+    "'": "quote",
+    "`": "quasiquote",
+    "~@": "splice-unquote",
+    "~": "unquote",
+    "@": "deref",
+}
+
+
+def read_fast(x: str) -> MalExpression:
+    """Parse a string into a MalExpression with a regex tokenizer.
+
+    Collections and reader macros that are still open are kept on an
+    explicit stack, so deeply nested input does not recurse."""
+    # (closer, items, 0) for an open collection and (token, None, end) for
+    # a reader macro, end being the position just after the macro.
+    stack: List[Tuple[str, Optional[List[MalExpression]], int]] = []
+    # read reports errors in atoms only once the whole form has parsed
+    error: Optional[Exception] = None
+    pos = 0
+    while True:
+        match = _TOKEN.match(x, _SKIP.match(x, pos).end())  # type: ignore
+        kind = match.lastgroup if match is not None else None
+        token = match.group(kind) if match is not None else ""  # type: ignore
+        if match is None or kind == "close" and (not stack or stack[-1][0] != token):
+            # The grammar backtracks to read a reader macro with no form
+            # after it as a symbol, when it is made of symbol characters.
+            while stack and stack[-1][0] in _QUOTES:
+                stack.pop()
+            if not stack or stack[-1][1] is not None:
+                raise MalSyntaxException("invalid syntax or unexpected EOF")
+            token, _, pos = stack.pop()
+            if token == "~@":
+                stack.append(("~", None, pos - 1))
+                token = "@"
+            kind = "symbol"
+        else:
+            pos = match.end()
+
+        value: MalExpression
+        if kind == "open":
+            stack.append((_CLOSERS[token], [], 0))
+            continue
+        elif kind == "macro":
+            stack.append((token, None, pos))
+            continue
+        try:
+            if kind == "close":
+                value = _collection(token, stack.pop()[1])  # type: ignore
+            else:
+                value = _atom(kind, token)
+        except (MalSyntaxException, AssertionError, IndexError) as e:
+            error = error or e
+            value = MalNil()
+
+        while stack and stack[-1][1] is None:
+            value = MalList.from_owned([MalSymbol(_MACROS[stack.pop()[0]]), value])
+        if not stack:
+            if error is not None:
+                raise error
+            return value
+        stack[-1][1].append(value)  # type: ignore
+
+
+def _atom(kind: Optional[str], token: str) -> MalExpression:
+    if kind == "int":
+        return MalInt(int(token))
+    elif kind == "string":
+        if len(token) < 2 or token[-1] != '"':
+            raise MalSyntaxException("unbalanced string")
+        return MalString(_unescape(token[1:-1]))
+    elif kind == "keyword":
+        assert len(token) > 1
+        return MalString(token[1:], keyword=True)
+    elif kind == "nil":
+        return MalNil()
+    elif kind == "boolean":
+        return MalBoolean(token == "true")
+    return MalSymbol(token)
+
+
+def _collection(closer: str, items: List[MalExpression]) -> MalExpression:
+    if closer == ")":
+        return MalList.from_owned(items)
+    if closer == "]":
+        return MalVector.from_owned(items)
+    assert len(items) % 2 == 0
+    dict: Dict[Any, MalExpression] = {}
+    for i in range(0, len(items), 2):
+        dict[to_key(items[i])] = items[i + 1]
+    return MalHash_map.from_owned(dict)
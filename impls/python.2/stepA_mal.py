@@ -4,6 +4,7 @@ from typing import List, Dict
 
 import core
 import reader
+import vm
 from env import Env
 from mal_types import (
     MalExpression,
@@ -30,19 +31,19 @@ def eval_ast(ast: MalExpression, env: Env) -> MalExpression:
     if isinstance(ast, MalSymbol):
         return env.get(ast)
     if isinstance(ast, MalList):
-        return MalList([EVAL(x, env) for x in ast.native()])
+        return MalList.from_owned([EVAL(x, env) for x in ast.native()])
     if isinstance(ast, MalVector):
-        return MalVector([EVAL(x, env) for x in ast.native()])
+        return MalVector.from_owned([EVAL(x, env) for x in ast.native()])
     if isinstance(ast, MalHash_map):
         new_dict = {}  # type: Dict[str, MalExpression]
         for key in ast.native():
             new_dict[key] = EVAL(ast.native()[key], env)
-        return MalHash_map(new_dict)
+        return MalHash_map.from_owned(new_dict)
     return ast
 
 
 def is_pair(x: MalExpression) -> bool:
-    if (isinstance(x, MalList) or isinstance(x, MalVector)) and len(x.native()) > 0:
+    if (isinstance(x, MalList) or isinstance(x, MalVector)) and x.count() > 0:
         return True
     return False
 
@@ -50,27 +51,25 @@ def is_pair(x: MalExpression) -> bool:
 def quasiquote(ast: MalExpression) -> MalExpression:
     if not is_pair(ast):
         return MalList([MalSymbol("quote"), ast])
-    elif core.equal(ast.native()[0], MalSymbol("unquote")).native():
+    elif core.equal(ast.first(), MalSymbol("unquote")).native():
         return ast.native()[1]
     elif (
-        is_pair(ast.native()[0])
-        and core.equal(
-            ast.native()[0].native()[0], MalSymbol("splice-unquote")
-        ).native()
+        is_pair(ast.first())
+        and core.equal(ast.first().native()[0], MalSymbol("splice-unquote")).native()
     ):
         return MalList(
             [
                 MalSymbol("concat"),
-                ast.native()[0].native()[1],
-                quasiquote(MalList(ast.native()[1:])),
+                ast.first().native()[1],
+                quasiquote(ast.rest()),
             ]
         )
     else:
         return MalList(
             [
                 MalSymbol("cons"),
-                quasiquote(ast.native()[0]),
-                quasiquote(MalList(ast.native()[1:])),
+                quasiquote(ast.first()),
+                quasiquote(ast.rest()),
             ]
         )
 
@@ -194,14 +193,18 @@ def PRINT(x: MalExpression) -> str:
     return str(x)
 
 
-def rep(x: str, env: Env) -> str:
+def rep(x: str, env: Env, use_vm: bool = False) -> str:
+    if use_vm:
+        return PRINT(vm.run(READ(x), env))
     return PRINT(EVAL(READ(x), env))
 
 
-def init_repl_env() -> Env:
+def init_repl_env(use_vm: bool = False) -> Env:
     def eval_func(args: List[MalExpression], env: Env) -> MalExpression:
         a0 = args[0]
         assert isinstance(a0, MalExpression)
+        if use_vm:
+            return vm.run(a0, env)
         return EVAL(a0, env)
 
     env = Env(None)
@@ -209,11 +212,12 @@ def init_repl_env() -> Env:
         env.set(key, core.ns[key])
 
     env.set("eval", MalFunctionCompiled(lambda args: eval_func(args, env)))
-    rep('(def! *host-language* "python.2")', env)
+    rep('(def! *host-language* "python.2")', env, use_vm)
 
     rep(
         '(def! load-file (fn* (f) (eval (read-string (str "(do " (slurp f) "\nnil)")))))',
         env,
+        use_vm,
     )
 
     mal_argv = MalList([MalString(x) for x in sys.argv[2:]])
@@ -222,6 +226,7 @@ def init_repl_env() -> Env:
     rep(
         "(defmacro! cond (fn* (& xs) (if (> (count xs) 0) (list 'if (first xs) (if (> (count xs) 1) (nth xs 1) (throw \"odd number of forms to cond\")) (cons 'cond (rest (rest xs)))))))",
         env,
+        use_vm,
     )
 
     return env
@@ -260,9 +265,9 @@ def macroexpand(ast: MalExpression, env: Env) -> MalExpression:
         continue
 
 
-def rep_handling_exceptions(line: str, repl_env: Env) -> str:
+def rep_handling_exceptions(line: str, repl_env: Env, use_vm: bool = False) -> str:
     try:
-        return rep(line, repl_env)
+        return rep(line, repl_env, use_vm)
     except MalUnknownSymbolException as e:
         return "'" + e.func + "' not found"
     except MalException as e:
@@ -272,19 +277,24 @@ def rep_handling_exceptions(line: str, repl_env: Env) -> str:
 if __name__ == "__main__":
     # repl loop
     eof: bool = False
-    repl_env = init_repl_env()
+    flags: List[str] = []
+    while len(sys.argv) >= 2 and sys.argv[1] in ("--vm", "--fast-reader"):
+        flags.append(sys.argv.pop(1))
+    use_vm: bool = "--vm" in flags
+    reader.use_fast_reader = "--fast-reader" in flags
+    repl_env = init_repl_env(use_vm)
 
     if len(sys.argv) >= 2:
         file_str = sys.argv[1]
-        rep_handling_exceptions('(load-file "' + file_str + '")', repl_env)
+        rep_handling_exceptions('(load-file "' + file_str + '")', repl_env, use_vm)
         exit(0)
 
-    rep('(println (str "Mal [" *host-language* "]"))', repl_env)
+    rep('(println (str "Mal [" *host-language* "]"))', repl_env, use_vm)
 
     while not eof:
         try:
             line = input("user> ")
             readline.add_history(line)
-            print(rep_handling_exceptions(line, repl_env))
+            print(rep_handling_exceptions(line, repl_env, use_vm))
         except EOFError:
             eof = True
@@ -1,5 +1,7 @@
 import unittest
 
+import mal_types
+import reader
 import stepA_mal
 
 
@@ -62,6 +64,110 @@ class TestStepA(unittest.TestCase):
         )
         self.assertEqual("(1 2 3)", self.rep('(get @e "bar")'))
 
+    def test_chunked_list_concat_cons_rest(self):
+        self.rep("(def! a (list 1 2 3))")
+        self.rep("(def! b (concat (rest a) [4 5] (cons 0 a)))")
+        self.assertEqual("(2 3 4 5 0 1 2 3)", self.rep("b"))
+        self.assertEqual("8", self.rep("(count b)"))
+        self.assertEqual("4", self.rep("(nth b 2)"))
+        self.assertEqual("(3 4 5 0 1 2 3)", self.rep("(rest b)"))
+        self.assertEqual("true", self.rep("(= b [2 3 4 5 0 1 2 3])"))
+        self.assertEqual("(1 2 3)", self.rep("a"))
+        self.assertEqual("(1 2 3 x)", self.rep("`(~@a x)"))
+
+    def test_structural_hash_map_keys(self):
+        self.assertEqual("3", self.rep("(get {[1 2] 3} (list 1 2))"))
+        self.assertEqual("{1 :a nil 2}", self.rep("(assoc {} 1 :a nil 2)"))
+        self.assertEqual("true", self.rep("(contains? {{:a [1]} 0} {:a (list 1)})"))
+        self.assertEqual("nil", self.rep("(get {1 :int} true)"))
+        self.assertEqual("(1 :k)", self.rep("(keys {1 2 :k 3})"))
+        self.assertEqual("{}", self.rep("(dissoc {1 2 :a 3} 1 :a)"))
+        self.assertEqual("true", self.rep('(= {"a" (list 1)} {"a" [1]})'))
+
+    def test_structural_hash_is_cached(self):
+        value = stepA_mal.READ("(1 [2 3] {:a 4})")
+        self.assertEqual(hash(value), hash(stepA_mal.READ("[1 (2 3) {:a 4}]")))
+        self.assertEqual(hash(value), value._hash)
+
+    def test_consed_list_keeps_few_chunks(self):
+        values = mal_types.MalList([])
+        for i in range(1000):
+            values = values.cons(mal_types.MalInt(i))
+            self.assertLessEqual(len(values.chunks()), 11)
+        self.assertEqual(list(range(999, -1, -1)), [x.native() for x in values.native()])
+        self.rep("(def! build (fn* [n acc] (if (= n 0) acc (build (- n 1) (cons n acc)))))")
+        self.rep("(def! built (build 2000 ()))")
+        self.assertEqual("2000", self.rep("(count built)"))
+        self.assertEqual("(1 2 3)", self.rep("(list (nth built 0) (first (rest built)) (nth built 2))"))
+        self.assertEqual("2000", self.rep("(nth built 1999)"))
+
+    def test_rotated_list_stays_correct(self):
+        self.rep("(def! atm (atom (list 0 1 2 3 4 5 6 7 8 9)))")
+        for _ in range(100):
+            self.rep("(swap! atm (fn* [a] (concat (rest a) (list (first a)))))")
+        self.assertEqual("(0 1 2 3 4 5 6 7 8 9)", self.rep("@atm"))
+        self.assertEqual(
+            "6", self.rep("(first (rest (rest (rest (rest (rest (rest @atm)))))))")
+        )
+
+    def test_shared_nil_booleans_and_small_ints(self):
+        self.assertIs(
+            mal_types.NIL, stepA_mal.EVAL(stepA_mal.READ("(first [])"), self._repl_env)
+        )
+        self.assertIs(mal_types.TRUE, stepA_mal.READ("true"))
+        self.assertIs(
+            mal_types.FALSE, stepA_mal.EVAL(stepA_mal.READ("(= 1 2)"), self._repl_env)
+        )
+        self.assertIs(mal_types.MalInt(7), stepA_mal.READ("7"))
+        big = stepA_mal.EVAL(stepA_mal.READ("(* 1000 1000)"), self._repl_env)
+        self.assertEqual(mal_types.MalInt(1000000), big)
+        self.assertEqual("1000000", str(big))
+        self.assertFalse(hasattr(big, "__dict__"))
+
+    def test_from_owned_takes_the_collection(self):
+        values = [mal_types.MalInt(1)]
+        self.assertIs(values, mal_types.MalList.from_owned(values).native())
+        self.assertIs(values, mal_types.MalVector.from_owned(values).native())
+        dict_ = {"a": mal_types.MalInt(1)}
+        self.assertIs(dict_, mal_types.MalHash_map.from_owned(dict_).native())
+        for cls in (mal_types.MalList, mal_types.MalVector):
+            with self.assertRaises(AssertionError):
+                cls([1])
+        self.assertEqual(
+            "{:a 1}", self.rep("(dissoc (assoc {:a 1} :b 2 :c 3) :b :c :d)")
+        )
+        self.assertEqual("{:a 1}", self.rep("(let* [m {:a 1} n (assoc m :b 2)] m)"))
+        self.assertEqual("(1 2)", self.rep("(vals {:a 1 :b 2})"))
+        with self.assertRaises(mal_types.MalInvalidArgumentException):
+            self.rep("(assoc {:a 1} :b 2 :c)")
+        with self.assertRaises(mal_types.MalInvalidArgumentException):
+            self.rep("(hash-map :a 1 :b)")
+        self.assertEqual("{:a 1 :b 2}", self.rep("(hash-map :a 1 :b 2)"))
+
+    def test_fast_reader_builds_the_same_trees(self):
+        for text in [
+            '(def! a [1 -2 "x\\ny\\"" :k nil true false] {:a (b)}) ; comment',
+            "'a `(b ~c ~@d) @e",
+            "(@ ~@)",
+            "(1 2 3 4 5 6 7 8 9 10 11 12 13 14 15 16 17 18 19 20 21 22 23 24 25)",
+            "(12abc nil? true)",
+        ]:
+            fast = reader.read_fast(text)
+            self.assertEqual(reader.read(text), fast)
+            self.assertEqual(reader.read(text).readable_str(), fast.readable_str())
+        for text in ["(1", "[)", '"abc', "{:a}", ""]:
+            with self.assertRaises(Exception):
+                reader.read_fast(text)
+
+    def test_read_string_with_the_fast_reader(self):
+        reader.use_fast_reader = True
+        try:
+            self.assertEqual(
+                "(1 [2] {:a 3})", self.rep('(read-string "(1 [2] {:a 3})")')
+            )
+        finally:
+            reader.use_fast_reader = False
+
 
 if __name__ == "__main__":
     unittest.main()
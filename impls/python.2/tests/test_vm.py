@@ -0,0 +1,113 @@
+import unittest
+
+import stepA_mal
+import vm
+from mal_types import MalInvalidArgumentException, MalUnknownSymbolException
+
+
+class TestVM(unittest.TestCase):
+    def setUp(self) -> None:
+        self._repl_env = stepA_mal.init_repl_env(use_vm=True)
+
+    def rep(self, input: str) -> str:
+        return stepA_mal.rep(input, self._repl_env, use_vm=True)
+
+    def test_vm_if_do_let(self):
+        self.assertEqual("7", self.rep("(if (< 1 2) (do 1 7) 8)"))
+        self.assertEqual("nil", self.rep("(if false 1)"))
+        self.assertEqual("3", self.rep("(let* (a 1 b (+ a 1)) (+ a b))"))
+
+    def test_vm_compiles_flat_code(self):
+        code = vm.compile_ast(stepA_mal.READ("(if true 1 2)"))
+        self.assertEqual(vm.RETURN, code.ops[-2])
+        self.assertTrue(all(isinstance(op, int) for op in code.ops))
+
+    def test_vm_deep_non_tail_recursion(self):
+        self.rep("(def! sumdown (fn* (n) (if (= n 0) 0 (+ n (sumdown (- n 1))))))")
+        self.assertEqual("50005000", self.rep("(sumdown 10000)"))
+
+    def test_vm_tail_calls(self):
+        self.rep("(def! sum2 (fn* (n acc) (if (= n 0) acc (sum2 (- n 1) (+ n acc)))))")
+        self.assertEqual("50005000", self.rep("(sum2 10000 0)"))
+
+    def test_vm_macros(self):
+        self.rep("(defmacro! unless (fn* (p a b) `(if ~p ~b ~a)))")
+        self.assertEqual("7", self.rep("(unless false 7 8)"))
+        self.assertEqual("8", self.rep("(cond false 7 true 8)"))
+        self.assertEqual("(if true 8 7)", self.rep("(macroexpand (unless true 7 8))"))
+
+    def test_vm_macro_expansions_are_cached_per_site(self):
+        self.rep("(def! expansions (atom 0))")
+        self.rep("(defmacro! twice (fn* (x) (do (swap! expansions + 1) `(* 2 ~x))))")
+        self.rep("(def! f (fn* (n) (twice n)))")
+        self.assertEqual("(2 4 6)", self.rep("(list (f 1) (f 2) (f 3))"))
+        self.assertEqual("1", self.rep("@expansions"))
+        self.rep("(defmacro! twice (fn* (x) `(+ 100 ~x)))")
+        self.assertEqual("101", self.rep("(f 1)"))
+
+    def test_vm_try_catch(self):
+        self.rep("(def! f (fn* (n) (if (= n 0) (throw n) (+ 1 (f (- n 1))))))")
+        self.assertEqual(
+            '"caught 0"', self.rep('(try* (f 100) (catch* e (str "caught " e)))')
+        )
+        self.assertEqual("3", self.rep("(try* (+ 1 2) (catch* e 0))"))
+
+    def test_vm_native_calls_back_into_vm(self):
+        self.assertEqual("(2 3 4)", self.rep("(map (fn* (x) (+ x 1)) (list 1 2 3))"))
+        self.assertEqual("6", self.rep("(apply + 2 (list 4))"))
+        self.assertEqual("3", self.rep("(eval (list + 1 2))"))
+
+    def test_vm_lexical_addressing(self):
+        code = vm.compile_ast(stepA_mal.READ("(fn* (a) (let* (b 1) (+ a b)))"))
+        body = code.consts[code.ops[1]].code
+        loads = [(body.ops[i], body.ops[i + 1]) for i in range(0, len(body.ops), 2)]
+        self.assertIn((vm.LOAD_LOCAL, 1), loads)
+        self.assertIn((vm.LOAD_GLOBAL, body.consts.index("+")), loads)
+        self.assertTrue(
+            any(op == vm.LOAD_OUTER and body.consts[arg] == (1, 1) for op, arg in loads)
+        )
+
+    def test_vm_let_bindings_see_outer_values(self):
+        self.rep("(def! x 1)")
+        self.assertEqual("2", self.rep("(let* (x (+ x 1)) x)"))
+        self.assertEqual("3", self.rep("(let* (x 2 x (+ x 1)) x)"))
+        self.assertEqual("1", self.rep("x"))
+
+    def test_vm_let_closures_see_later_bindings(self):
+        self.assertEqual(
+            "0",
+            self.rep(
+                "(let* (f (fn* (n) (if (= n 0) n (g (- n 1)))) g (fn* (n) (f n))) (f 5))"
+            ),
+        )
+
+    def test_vm_closures_capture_frames(self):
+        self.rep("(def! adder (fn* (a) (fn* (b) (let* (c 1) (+ a (+ b c))))))")
+        self.assertEqual("6", self.rep("((adder 2) 3)"))
+        self.assertEqual("(2 3)", self.rep("((fn* (a & more) more) 1 2 3)"))
+
+    def test_vm_def_in_local_scope(self):
+        self.assertEqual("5", self.rep("((fn* (a) (do (def! b (+ a 1)) b)) 4)"))
+        with self.assertRaises(MalUnknownSymbolException):
+            self.rep("b")
+
+    def test_vm_def_that_does_not_run(self):
+        self.rep("(def! b 7)")
+        self.rep("(def! f (fn* (c) (do (if c (def! b 1) nil) b)))")
+        self.assertEqual("7", self.rep("(f false)"))
+        self.assertEqual("1", self.rep("(f true)"))
+        self.assertEqual(
+            "7", self.rep("((fn* (c) (let* (d 2) (do (if c (def! b d) nil) b))) false)")
+        )
+        with self.assertRaises(MalUnknownSymbolException):
+            self.rep(
+                "((fn* (c) (do (if c (def! undefined-b 1) nil) undefined-b)) false)"
+            )
+
+    def test_vm_not_a_function(self):
+        with self.assertRaises(MalInvalidArgumentException):
+            self.rep("(1 2)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,543 @@
+from typing import Any, List, Optional
+
+from env import Env, Scope
+from mal_types import (
+    MalExpression,
+    MalSymbol,
+    MalException,
+    MalList,
+    MalNil,
+    MalBoolean,
+    MalFunctionCompiled,
+    MalFunctionRaw,
+    MalVector,
+    MalHash_map,
+    MalInvalidArgumentException,
+)
+
+# Opcodes. Every instruction is an (opcode, operand) pair in Code.ops.
+LOAD_LOCAL = 0
+LOAD_OUTER = 1
+LOAD_GLOBAL = 2
+CONST = 3
+CALL = 4
+TAIL_CALL = 5
+RETURN = 6
+JUMP_IF_FALSE = 7
+JUMP = 8
+MACRO = 9
+POP = 10
+DEF = 11
+DEF_LOCAL = 12
+BIND = 13
+CLOSURE = 14
+PUSH_FRAME = 15
+POP_FRAME = 16
+MAKE_VECTOR = 17
+MAKE_MAP = 18
+MAKE_MACRO = 19
+MACROEXPAND = 20
+SETUP_TRY = 21
+POP_TRY = 22
+BIND_CATCH = 23
+LOAD_FIRST = 24
+
+
+class Code(object):
+    """A flat instruction array plus its constant pool."""
+
+    def __init__(self) -> None:
+        self.ops: List[int] = []
+        self.consts: List[Any] = []
+
+    def const(self, value: Any) -> int:
+        self.consts.append(value)
+        return len(self.consts) - 1
+
+    def emit(self, op: int, arg: int = 0) -> int:
+        self.ops.append(op)
+        self.ops.append(arg)
+        return len(self.ops) - 2
+
+    def patch(self, at: int) -> None:
+        self.ops[at + 1] = len(self.ops)
+
+
+class _Lambda(object):
+    """Everything CLOSURE needs from a compiled fn* form."""
+
+    def __init__(
+        self,
+        params: MalList,
+        ast: MalExpression,
+        code: Code,
+        scope: Scope,
+        n_fixed: int,
+        variadic: bool,
+    ) -> None:
+        self.params = params
+        self.ast = ast
+        self.code = code
+        self.scope = scope
+        self.n_fixed = n_fixed
+        self.variadic = variadic
+
+
+class VMFunction(MalFunctionRaw):
+    """A fn* closure whose body has been compiled to bytecode.
+
+    env is the frame list the closure was created in, globals the Env
+    that symbols without a lexical binding are looked up in."""
+
+    __slots__ = ("code", "globals", "_lambda")
+
+    def __init__(self, lambda_: _Lambda, env: Any, globals_: Env) -> None:
+        def fn(args: List[MalExpression]) -> MalExpression:
+            return execute(lambda_.code, self.frame(args), globals_)
+
+        super().__init__(fn=fn, ast=lambda_.ast, params=lambda_.params, env=env)
+        self.code = lambda_.code
+        self.globals = globals_
+        self._lambda = lambda_
+
+    def frame(self, args: List[MalExpression]) -> List[Any]:
+        lambda_ = self._lambda
+        if lambda_.variadic:
+            n = lambda_.n_fixed
+            frame = [self._env, *args[:n], MalList.from_owned(args[n:])]
+        else:
+            frame = [self._env, *args]
+        size = lambda_.scope.size()
+        if len(frame) < size:
+            frame.extend([None] * (size - len(frame)))
+        return frame
+
+
+class _MacroSite(object):
+    """A call whose head may name a macro when it runs.
+
+    expansion is the compiled one-step expansion made with macro; a
+    defmacro! that binds the name again binds a new object, which makes
+    the site expand and compile again."""
+
+    def __init__(
+        self, name: str, ast: MalList, tail: bool, scope: Optional[Scope]
+    ) -> None:
+        self.name = name
+        self.ast = ast
+        self.tail = tail
+        self.scope = scope
+        self.end = 0
+        self.macro: Optional[MalExpression] = None
+        self.expansion: Optional[Code] = None
+
+
+def _is_pair(x: MalExpression) -> bool:
+    return (isinstance(x, MalList) or isinstance(x, MalVector)) and x.count() > 0
+
+
+def _is_symbol(x: MalExpression, name: str) -> bool:
+    return isinstance(x, MalSymbol) and x.native() == name
+
+
+def quasiquote(ast: MalExpression) -> MalExpression:
+    if not _is_pair(ast):
+        return MalList([MalSymbol("quote"), ast])
+    head = ast.first()
+    if _is_symbol(head, "unquote"):
+        return ast.native()[1]
+    if _is_pair(head) and _is_symbol(head.native()[0], "splice-unquote"):
+        return MalList(
+            [
+                MalSymbol("concat"),
+                head.native()[1],
+                quasiquote(ast.rest()),
+            ]
+        )
+    return MalList([MalSymbol("cons"), quasiquote(head), quasiquote(ast.rest())])
+
+
+def _macro(ast: MalExpression, env: Env) -> Optional[MalExpression]:
+    if not isinstance(ast, MalList) or len(ast.native()) == 0:
+        return None
+    head = ast.native()[0]
+    if not isinstance(head, MalSymbol) or env.find(head) is None:
+        return None
+    func = env.get(head)
+    if isinstance(func, (MalFunctionCompiled, MalFunctionRaw)) and func.is_macro():
+        return func
+    return None
+
+
+def macroexpand(ast: MalExpression, env: Env) -> MalExpression:
+    func = _macro(ast, env)
+    while func is not None:
+        ast = func.call(ast.native()[1:])
+        func = _macro(ast, env)
+    return ast
+
+
+def compile_ast(ast: MalExpression, scope: Optional[Scope] = None) -> Code:
+    """Compile a form into a Code object whose last instruction is RETURN.
+
+    Symbols bound by an enclosing fn*, let* or catch* in scope are
+    compiled to slot loads; all others are looked up by name in the
+    global Env when the code runs."""
+    code = Code()
+    _compile(ast, code, True, scope)
+    code.emit(RETURN)
+    return code
+
+
+def _compile(
+    ast: MalExpression, code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    if isinstance(ast, MalSymbol):
+        name = ast.native()
+        locations, bound = scope.resolve_all(name) if scope is not None else ([], False)
+        if not locations:
+            code.emit(LOAD_GLOBAL, code.const(name))
+        elif not bound or len(locations) > 1:
+            code.emit(LOAD_FIRST, code.const((tuple(locations), name)))
+        elif locations[0][0] == 0:
+            code.emit(LOAD_LOCAL, locations[0][1])
+        else:
+            code.emit(LOAD_OUTER, code.const(locations[0]))
+    elif isinstance(ast, MalList):
+        elements = ast.native()
+        if len(elements) == 0:
+            code.emit(CONST, code.const(ast))
+        elif isinstance(elements[0], MalSymbol) and elements[0].native() in _SPECIAL:
+            _SPECIAL[elements[0].native()](elements, code, tail, scope)
+        else:
+            _compile_call(ast, code, tail, scope)
+    elif isinstance(ast, MalVector):
+        for x in ast.native():
+            _compile(x, code, False, scope)
+        code.emit(MAKE_VECTOR, len(ast.native()))
+    elif isinstance(ast, MalHash_map):
+        for key in ast.native():
+            _compile(ast.native()[key], code, False, scope)
+        code.emit(MAKE_MAP, code.const(list(ast.native())))
+    else:
+        code.emit(CONST, code.const(ast))
+
+
+def _compile_call(ast: MalList, code: Code, tail: bool, scope: Optional[Scope]) -> None:
+    elements = ast.native()
+    site = None
+    head = elements[0]
+    if isinstance(head, MalSymbol) and (
+        scope is None or scope.resolve(head.native()) is None
+    ):
+        site = _MacroSite(head.native(), ast, tail, scope)
+        code.emit(MACRO, code.const(site))
+    for x in elements:
+        _compile(x, code, False, scope)
+    code.emit(TAIL_CALL if tail else CALL, len(elements) - 1)
+    if site is not None:
+        site.end = len(code.ops)
+
+
+def _compile_macroexpand(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    code.emit(MACROEXPAND, code.const(elements[1]))
+
+
+def _compile_store(name: str, code: Code, scope: Optional[Scope]) -> None:
+    if scope is None:
+        code.emit(DEF, code.const(name))
+    else:
+        code.emit(DEF_LOCAL, scope.define(name, by_def=True))
+
+
+def _compile_def(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    _compile(elements[2], code, False, scope)
+    _compile_store(str(elements[1]), code, scope)
+
+
+def _compile_defmacro(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    _compile(elements[2], code, False, scope)
+    code.emit(MAKE_MACRO)
+    _compile_store(str(elements[1]), code, scope)
+
+
+def _compile_let(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    bindings = elements[1].native()
+    names = [str(bindings[i]) for i in range(0, len(bindings), 2)]
+    let_scope = Scope(scope)
+    for name in names:
+        let_scope.define(name)
+        let_scope.pending.add(name)
+    code.emit(PUSH_FRAME, code.const(let_scope))
+    for i, name in enumerate(names):
+        _compile(bindings[2 * i + 1], code, False, let_scope)
+        let_scope.pending.discard(name)
+        code.emit(BIND, let_scope.names[name])
+    _compile(elements[2], code, tail, let_scope)
+    code.emit(POP_FRAME)
+
+
+def _compile_do(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    for x in elements[1:-1]:
+        _compile(x, code, False, scope)
+        code.emit(POP)
+    _compile(elements[-1], code, tail, scope)
+
+
+def _compile_if(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    _compile(elements[1], code, False, scope)
+    jump_else = code.emit(JUMP_IF_FALSE)
+    _compile(elements[2], code, tail, scope)
+    jump_end = code.emit(JUMP)
+    code.patch(jump_else)
+    if len(elements) >= 4:
+        _compile(elements[3], code, tail, scope)
+    else:
+        code.emit(CONST, code.const(MalNil()))
+    code.patch(jump_end)
+
+
+def _compile_fn(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    params = elements[1]
+    names = [str(x) for x in params.native()]
+    variadic = "&" in names
+    n_fixed = names.index("&") if variadic else len(names)
+    fn_scope = Scope(scope, is_fn=True)
+    for name in names[:n_fixed] + names[n_fixed + 1 : n_fixed + 2]:
+        fn_scope.define(name)
+    body = compile_ast(elements[2], fn_scope)
+    lambda_ = _Lambda(params, elements[2], body, fn_scope, n_fixed, variadic)
+    code.emit(CLOSURE, code.const(lambda_))
+
+
+def _compile_quote(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    value = elements[1]
+    if isinstance(value, MalVector):
+        value = MalList(value.native())
+    code.emit(CONST, code.const(value))
+
+
+def _compile_quasiquote(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    _compile(quasiquote(elements[1]), code, tail, scope)
+
+
+def _compile_try(
+    elements: List[MalExpression], code: Code, tail: bool, scope: Optional[Scope]
+) -> None:
+    catch_block = elements[2] if len(elements) >= 3 else None
+    if not (
+        isinstance(catch_block, MalList)
+        and len(catch_block.native()) == 3
+        and _is_symbol(catch_block.native()[0], "catch*")
+        and isinstance(catch_block.native()[1], MalSymbol)
+    ):
+        _compile(elements[1], code, False, scope)
+        return
+    setup = code.emit(SETUP_TRY)
+    _compile(elements[1], code, False, scope)
+    code.emit(POP_TRY)
+    jump_end = code.emit(JUMP)
+    code.patch(setup)
+    catch_scope = Scope(scope)
+    code.emit(BIND_CATCH, catch_scope.define(str(catch_block.native()[1])))
+    _compile(catch_block.native()[2], code, False, catch_scope)
+    code.emit(POP_FRAME)
+    code.patch(jump_end)
+
+
+_SPECIAL = {
+    "macroexpand": _compile_macroexpand,
+    "def!": _compile_def,
+    "defmacro!": _compile_defmacro,
+    "let*": _compile_let,
+    "do": _compile_do,
+    "if": _compile_if,
+    "fn*": _compile_fn,
+    "quote": _compile_quote,
+    "quasiquote": _compile_quasiquote,
+    "try*": _compile_try,
+}
+
+
+def run(ast: MalExpression, env: Env) -> MalExpression:
+    return execute(compile_ast(ast), env, env)
+
+
+def execute(code: Code, env: Any, globals_: Env) -> MalExpression:
+    """Run code with env as its innermost frame.
+
+    env is either a frame list (index 0 holding the outer frame) or, at
+    top level, globals_ itself. Calls between VMFunctions push onto the
+    frames list instead of the python stack, so only native functions
+    calling back into mal (map, apply, swap!, macros) nest python frames."""
+    stack: List[Any] = []
+    frames: List[Any] = []
+    ops, consts, pc, base, handlers = code.ops, code.consts, 0, 0, None
+    while True:
+        try:
+            while True:
+                op = ops[pc]
+                arg = ops[pc + 1]
+                pc += 2
+                if op == LOAD_LOCAL:
+                    stack.append(env[arg])
+                elif op == LOAD_OUTER:
+                    depth, slot = consts[arg]
+                    frame = env
+                    while depth:
+                        frame = frame[0]
+                        depth -= 1
+                    stack.append(frame[slot])
+                elif op == LOAD_FIRST:
+                    # A slot that only a def! fills is None until it runs.
+                    locations, name = consts[arg]
+                    for depth, slot in locations:
+                        frame = env
+                        while depth:
+                            frame = frame[0]
+                            depth -= 1
+                        value = frame[slot] if slot < len(frame) else None
+                        if value is not None:
+                            break
+                    else:
+                        value = globals_.get(name)
+                    stack.append(value)
+                elif op == LOAD_GLOBAL:
+                    stack.append(globals_.get(consts[arg]))
+                elif op == CONST:
+                    stack.append(consts[arg])
+                elif op == MACRO:
+                    site = consts[arg]
+                    func = _macro(site.ast, globals_)
+                    if func is None:
+                        continue
+                    if site.macro is not func:
+                        # nested macro calls in the expansion get sites of
+                        # their own
+                        site.expansion = compile_ast(
+                            func.call(site.ast.native()[1:]), site.scope
+                        )
+                        site.macro = func
+                    expansion = site.expansion
+                    if site.tail:
+                        del stack[base:]
+                    else:
+                        frames.append((code, site.end, env, base, handlers, globals_))
+                        base = len(stack)
+                    code, pc, handlers = expansion, 0, None
+                    ops, consts = code.ops, code.consts
+                elif op == CALL or op == TAIL_CALL:
+                    f = stack[-arg - 1]
+                    args = stack[len(stack) - arg :]
+                    del stack[-arg - 1 :]
+                    if isinstance(f, VMFunction):
+                        if op == CALL:
+                            frames.append((code, pc, env, base, handlers, globals_))
+                            base = len(stack)
+                        else:
+                            del stack[base:]
+                        env = f.frame(args)
+                        globals_ = f.globals
+                        code, pc, handlers = f.code, 0, None
+                        ops, consts = code.ops, code.consts
+                    elif isinstance(f, MalFunctionCompiled) or isinstance(
+                        f, MalFunctionRaw
+                    ):
+                        stack.append(f.call(args))
+                    else:
+                        raise MalInvalidArgumentException(f, "not a function")
+                elif op == RETURN:
+                    value = stack[-1]
+                    if not frames:
+                        return value
+                    del stack[base:]
+                    code, pc, env, base, handlers, globals_ = frames.pop()
+                    ops, consts = code.ops, code.consts
+                    stack.append(value)
+                elif op == JUMP_IF_FALSE:
+                    value = stack.pop()
+                    if isinstance(value, MalNil) or (
+                        isinstance(value, MalBoolean) and value.native() is False
+                    ):
+                        pc = arg
+                elif op == JUMP:
+                    pc = arg
+                elif op == POP:
+                    stack.pop()
+                elif op == PUSH_FRAME:
+                    stack.append(env)
+                    frame = [None] * consts[arg].size()
+                    frame[0] = env
+                    env = frame
+                elif op == BIND:
+                    env[arg] = stack.pop()
+                elif op == POP_FRAME:
+                    value = stack.pop()
+                    env = stack.pop()
+                    stack.append(value)
+                elif op == DEF:
+                    globals_.set(consts[arg], stack[-1])
+                elif op == DEF_LOCAL:
+                    # A def! inside a macro expansion can add a slot to a
+                    # frame that already exists.
+                    if arg >= len(env):
+                        env.extend([None] * (arg + 1 - len(env)))
+                    env[arg] = stack[-1]
+                elif op == CLOSURE:
+                    stack.append(VMFunction(consts[arg], env, globals_))
+                elif op == MAKE_VECTOR:
+                    values = stack[len(stack) - arg :]
+                    del stack[len(stack) - arg :]
+                    stack.append(MalVector.from_owned(values))
+                elif op == MAKE_MAP:
+                    keys = consts[arg]
+                    values = stack[len(stack) - len(keys) :]
+                    del stack[len(stack) - len(keys) :]
+                    stack.append(MalHash_map.from_owned(dict(zip(keys, values))))
+                elif op == MAKE_MACRO:
+                    value = stack[-1]
+                    assert isinstance(value, MalFunctionCompiled) or isinstance(
+                        value, MalFunctionRaw
+                    )
+                    value.make_macro()
+                elif op == MACROEXPAND:
+                    stack.append(macroexpand(consts[arg], globals_))
+                elif op == SETUP_TRY:
+                    if handlers is None:
+                        handlers = []
+                    handlers.append((arg, len(stack), env))
+                elif op == POP_TRY:
+                    handlers.pop()
+                elif op == BIND_CATCH:
+                    value = stack.pop()
+                    stack.append(env)
+                    env = [env, value]
+                else:
+                    raise Exception("internal error: unknown opcode " + str(op))
+        except MalException as e:
+            while not handlers:
+                if not frames:
+                    raise
+                code, pc, env, base, handlers, globals_ = frames.pop()
+            pc, depth, env = handlers.pop()
+            ops, consts = code.ops, code.consts
+            del stack[depth:]
+            stack.append(e.native())
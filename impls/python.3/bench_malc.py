@@ -0,0 +1,45 @@
+#!/bin/usr/env python
+"""Time reading the forms of lib/*.mal, and load-file of the same files,
+without the .malc cache, with a cold cache and with a warm one."""
+import glob
+import os
+import tempfile
+import time
+
+import malc
+import stepA_mal
+
+LIB = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib", "*.mal")))
+ROUNDS = 50
+
+
+def time_lib(load) -> float:
+    start = time.perf_counter()
+    for path in LIB:
+        load(path)
+    return time.perf_counter() - start
+
+
+def run(load) -> tuple:
+    os.environ["MAL_CACHE_DIR"] = ""
+    uncached = sum(time_lib(load) for _ in range(ROUNDS))
+    cold = warm = 0.0
+    for _ in range(ROUNDS):
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ["MAL_CACHE_DIR"] = directory
+            cold += time_lib(load)
+            warm += time_lib(load)
+    return uncached, cold, warm
+
+
+def main():
+    stepA_mal.init_env()
+    results = {"read": run(malc.read_file), "load-file": run(stepA_mal.load_file)}
+    print(f"{len(LIB)} files, mean of {ROUNDS} rounds")
+    print(f"{'':<10}" + "".join(f"{name:>12}" for name in results))
+    for i, mode in enumerate(("no cache", "cold", "warm")):
+        print(f"{mode:<10}" + "".join(f"{totals[i] / ROUNDS * 1000:9.2f} ms" for totals in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/bin/usr/env python
+# Continuation machine evaluator: pending work is pushed as frames on an
+# explicit stack instead of recursing on the python stack, so the depth
+# of mal recursion is limited by memory, not sys.getrecursionlimit().
+import core
+import env
+import exceptions
+import mal_types
+
+_DEF = mal_types.Symbol("def!")
+_LET = mal_types.Symbol("let*")
+_DO = mal_types.Symbol("do")
+_IF = mal_types.Symbol("if")
+_FN = mal_types.Symbol("fn*")
+_QUOTE = mal_types.Symbol("quote")
+_QUASIQUOTE = mal_types.Symbol("quasiquote")
+_UNQUOTE = mal_types.Symbol("unquote")
+_SPLICE_UNQUOTE = mal_types.Symbol("splice-unquote")
+_DEFMACRO = mal_types.Symbol("defmacro!")
+_MACROEXPAND = mal_types.Symbol("macroexpand")
+_TRY = mal_types.Symbol("try*")
+_CATCH = mal_types.Symbol("catch*")
+_PY = mal_types.Symbol("py*")
+_PY_STMNT = mal_types.Symbol("py!*")
+_DOT = mal_types.Symbol(".")
+_COND = mal_types.Symbol("cond")
+_OR = mal_types.Symbol("or")
+_AND = mal_types.Symbol("and")
+_WHEN = mal_types.Symbol("when")
+_THREAD_FIRST = mal_types.Symbol("->")
+_THREAD_LAST = mal_types.Symbol("->>")
+_LAZY_SEQ = mal_types.Symbol("lazy-seq")
+
+# Continuation frame kinds; a frame is a tuple whose first item is one of these.
+_K_COLLECT = 0  # (kind, items, next index, values, env, finish)
+_K_IF = 1  # (kind, ast, env)
+_K_LET = 2  # (kind, bindings, index being bound, let env, body)
+_K_DO = 3  # (kind, ast, next index, env)
+_K_DEF = 4  # (kind, symbol, env)
+_K_DEFMACRO = 5  # (kind, symbol, env)
+_K_TRY = 6  # (kind, catch symbol, catch body, env)
+_K_MACRO = 7  # (kind, env)
+_K_MAP = 8  # (kind, fn, sequence, next index, values)
+_K_SWAP = 9  # (kind, atom)
+_K_COND = 10  # (kind, ast, index of the test, env)
+_K_OR = 11  # (kind, ast, index of the item, env)
+_K_AND = 12  # (kind, ast, index of the item, env)
+_K_WHEN = 13  # (kind, ast, env)
+_K_MEMO = 14  # (kind, store, key)
+
+_START = object()
+_COLLECTIONS = (mal_types.List, mal_types.Vector, mal_types.HashMap)
+
+
+def is_macro_call(ast, environ: env.Env) -> bool:
+    return (
+        isinstance(ast, mal_types.List)
+        and len(ast) > 0
+        and isinstance(ast[0], mal_types.Symbol)
+        and environ.find(ast[0]) is not None
+        and hasattr(environ.get(ast[0]), "__is_macro__")
+    )
+
+def macroexpand(ast, environ: env.Env):
+    while is_macro_call(ast, environ):
+        macro = environ.get(ast[0])
+        ast = macro(*ast[1:])
+    return ast
+
+def is_pair(ast) -> bool:
+    return core.issequence(ast) and len(ast) > 0
+
+def quasiquote(ast):
+    if not is_pair(ast):
+        return core.args_to_list(_QUOTE, ast)
+    elif ast[0] is _UNQUOTE:
+        return ast[1]
+    elif is_pair(ast[0]) and ast[0][0] is _SPLICE_UNQUOTE:
+        return core.args_to_list(
+            mal_types.Symbol("concat"),
+            ast[0][1],
+            quasiquote(ast[1:]),
+        )
+
+    return core.args_to_list(
+        mal_types.Symbol("cons"),
+        quasiquote(ast[0]),
+        quasiquote(ast[1:]),
+    )
+
+def thread(ast):
+    acc = ast[1]
+    for form in ast[2:]:
+        if not isinstance(form, mal_types.List):
+            acc = core.args_to_list(form, acc)
+        elif ast[0] is _THREAD_FIRST:
+            acc = form[:1] + (acc,) + form[1:]
+        else:
+            acc = form + (acc,)
+    return acc
+
+def _function(ast, environ, params):
+    def fn(*args):
+        return call(fn, args)
+    fn.__meta__ = None
+    fn.__ast__ = ast
+    fn.__gen_env__ = lambda args: env.Env(environ, params, mal_types.List(args))
+    return fn
+
+def _vector(values):
+    return mal_types.Vector(values)
+
+def _hash_map(keys):
+    return lambda values: mal_types.HashMap(zip(keys, values))
+
+def _dot(name):
+    return lambda values: eval(name)(*values)
+
+def _lazy_seq(body, environ):
+    return mal_types.LazySeq(lambda: EVAL(body, environ))
+
+def _enter(fn, args, stack):
+    """Start applying fn to args.
+
+    Returns (True, ast, env) when the machine has to evaluate a fn* body
+    and (False, value, None) when the result is already known. apply, map,
+    swap! and memoized functions are run by the machine so the mal
+    functions they call don't nest python frames."""
+    while True:
+        if hasattr(fn, "__ast__"):
+            return True, fn.__ast__, fn.__gen_env__(args)
+        elif fn is core._apply:
+            fn, args = args[0], tuple(args[1:-1]) + tuple(args[-1])
+        elif fn is core._map:
+            fn, sequence = args
+            if (
+                not core.issequence(sequence)
+                or isinstance(sequence, mal_types.LazySeq)
+                or len(sequence) == 0
+            ):
+                return False, core._map(fn, sequence), None
+            stack.append((_K_MAP, fn, sequence, 1, []))
+            args = (sequence[0],)
+        elif fn is core._swap:
+            atom = args[0]
+            if not isinstance(atom, mal_types.Atom):
+                return False, core._swap(*args), None
+            stack.append((_K_SWAP, atom))
+            fn, args = args[1], (atom.val,) + tuple(args[2:])
+        elif hasattr(fn, "__memoized__"):
+            fn, lookup, store = fn.__memoized__
+            hit, found = lookup(args)
+            if hit:
+                return False, found, None
+            if found is not None:
+                stack.append((_K_MEMO, store, found))
+        else:
+            return False, fn(*args), None
+
+def call(fn, args):
+    stack = []
+    evaluating, ast, environ = _enter(fn, args, stack)
+    return _run(stack, evaluating, ast, environ, ast)
+
+def EVAL(ast, environ: env.Env):
+    return _run([], True, ast, environ, None)
+
+def _run(stack, evaluating, ast, environ, value):
+    while True:
+        try:
+            while True:
+                if evaluating:
+                    evaluating = False
+                    if isinstance(ast, mal_types.Symbol):
+                        value = environ.get(ast)
+                        continue
+                    elif not isinstance(ast, mal_types.List):
+                        if isinstance(ast, mal_types.Vector) and len(ast) > 0:
+                            stack.append((_K_COLLECT, ast, 0, [], environ, _vector))
+                            value = _START
+                        elif isinstance(ast, mal_types.HashMap) and len(ast) > 0:
+                            finish = _hash_map(tuple(ast.keys()))
+                            stack.append((_K_COLLECT, tuple(ast.values()), 0, [], environ, finish))
+                            value = _START
+                        else:
+                            value = ast
+                        continue
+                    elif len(ast) == 0:
+                        value = ast
+                        continue
+
+                    first_elem = ast[0]
+                    native = core.native_form(ast, environ)
+                    if first_elem is _DEF:
+                        stack.append((_K_DEF, ast[1], environ))
+                        ast = ast[2]
+                        evaluating = True
+                    elif first_elem is _LET:
+                        bindings = ast[1]
+                        if len(bindings) % 2 != 0:
+                            raise exceptions.MalSyntaxError("Syntax Error: uneven number of list arguments")
+                        environ = env.Env(environ)
+                        if len(bindings) > 0:
+                            stack.append((_K_LET, bindings, 0, environ, ast[2]))
+                            ast = bindings[1]
+                        else:
+                            ast = ast[2]
+                        evaluating = True
+                    elif first_elem is _DO:
+                        if len(ast) > 2:
+                            stack.append((_K_DO, ast, 2, environ))
+                        ast = ast[1] if len(ast) > 1 else first_elem
+                        evaluating = True
+                    elif first_elem is _QUOTE:
+                        value = ast[-1]
+                    elif first_elem is _QUASIQUOTE:
+                        ast = quasiquote(ast[1])
+                        evaluating = True
+                    elif first_elem is _IF:
+                        if len(ast) < 3:
+                            raise exceptions.MalSyntaxError("Error: missing body")
+                        stack.append((_K_IF, ast, environ))
+                        ast = ast[1]
+                        evaluating = True
+                    elif first_elem is _TRY:
+                        if not (
+                            len(ast) < 3
+                            or not isinstance(ast[2], mal_types.List)
+                            or len(ast[2]) < 3
+                            or ast[2][0] is not _CATCH
+                        ):
+                            stack.append((_K_TRY, ast[2][1], ast[2][2], environ))
+                        ast = ast[1]
+                        evaluating = True
+                    elif first_elem is _FN:
+                        if len(ast) < 3:
+                            raise exceptions.MalSyntaxError("Syntax Error: Missing parameters or body")
+                        value = _function(ast[2], environ, ast[1])
+                    elif first_elem is _DEFMACRO:
+                        stack.append((_K_DEFMACRO, ast[1], environ))
+                        ast = ast[2]
+                        evaluating = True
+                    elif first_elem is _MACROEXPAND:
+                        value = macroexpand(ast[1], environ)
+                    elif first_elem is _PY_STMNT:
+                        exec(compile(ast[1], "", "single"), globals())
+                        value = None
+                    elif first_elem is _PY:
+                        value = core.py_to_mal(eval(ast[1]))
+                    elif native is _COND:
+                        if len(ast) == 1:
+                            value = None
+                        elif len(ast) == 2:
+                            raise exceptions.MalExceptionError("odd number of forms to cond")
+                        else:
+                            stack.append((_K_COND, ast, 1, environ))
+                            ast = ast[1]
+                            evaluating = True
+                    elif native is _OR or native is _AND:
+                        if len(ast) == 1:
+                            value = True if first_elem is _AND else None
+                        else:
+                            if len(ast) > 2:
+                                kind = _K_AND if first_elem is _AND else _K_OR
+                                stack.append((kind, ast, 1, environ))
+                            ast = ast[1]
+                            evaluating = True
+                    elif native is _WHEN:
+                        stack.append((_K_WHEN, ast, environ))
+                        ast = ast[1]
+                        evaluating = True
+                    elif native is _THREAD_FIRST or native is _THREAD_LAST:
+                        ast = thread(ast)
+                        evaluating = True
+                    elif first_elem is _LAZY_SEQ:
+                        value = _lazy_seq(core.args_to_list(_DO, *ast[1:]), environ)
+                    elif first_elem is _DOT:
+                        stack.append((_K_COLLECT, ast[2:], 0, [], environ, _dot(ast[1])))
+                        value = _START
+                    elif isinstance(first_elem, mal_types.Symbol):
+                        fn = environ.get(first_elem)
+                        if hasattr(fn, "__is_macro__"):
+                            stack.append((_K_MACRO, environ))
+                            evaluating, ast, environ = _enter(fn, ast[1:], stack)
+                            value = ast
+                        else:
+                            stack.append((_K_COLLECT, ast, 1, [fn], environ, None))
+                            value = _START
+                    else:
+                        stack.append((_K_COLLECT, ast, 0, [], environ, None))
+                        value = _START
+                    continue
+
+                if not stack:
+                    return value
+                frame = stack.pop()
+                kind = frame[0]
+                if kind == _K_COLLECT:
+                    _, items, i, values, environ, finish = frame
+                    if value is not _START:
+                        values.append(value)
+                    n = len(items)
+                    while i < n:
+                        item = items[i]
+                        i += 1
+                        if isinstance(item, mal_types.Symbol):
+                            values.append(environ.get(item))
+                        elif isinstance(item, _COLLECTIONS) and len(item) > 0:
+                            stack.append((_K_COLLECT, items, i, values, environ, finish))
+                            ast = item
+                            evaluating = True
+                            break
+                        else:
+                            values.append(item)
+                    else:
+                        if finish is not None:
+                            value = finish(values)
+                        else:
+                            evaluating, ast, environ = _enter(values[0], values[1:], stack)
+                            value = ast
+                elif kind == _K_IF:
+                    _, ast, environ = frame
+                    if value is not None and value is not False:
+                        ast = ast[2]
+                        evaluating = True
+                    elif len(ast) > 3:
+                        ast = ast[3]
+                        evaluating = True
+                    else:
+                        value = None
+                elif kind == _K_LET:
+                    _, bindings, i, environ, body = frame
+                    environ.set(bindings[i], value)
+                    i += 2
+                    if i < len(bindings):
+                        stack.append((_K_LET, bindings, i, environ, body))
+                        ast = bindings[i + 1]
+                    else:
+                        ast = body
+                    evaluating = True
+                elif kind == _K_DO:
+                    _, ast, i, environ = frame
+                    if i < len(ast) - 1:
+                        stack.append((_K_DO, ast, i + 1, environ))
+                    ast = ast[i]
+                    evaluating = True
+                elif kind == _K_DEF:
+                    frame[2].set(frame[1], value)
+                elif kind == _K_DEFMACRO:
+                    macro = core.copy_func(value)
+                    macro.__dict__.update(value.__dict__)
+                    macro.__is_macro__ = True
+                    frame[2].set(frame[1], macro)
+                    value = macro
+                elif kind == _K_MACRO:
+                    ast, environ = value, frame[1]
+                    evaluating = True
+                elif kind == _K_MAP:
+                    _, fn, sequence, i, values = frame
+                    values.append(value)
+                    if i < len(sequence):
+                        stack.append((_K_MAP, fn, sequence, i + 1, values))
+                        evaluating, ast, environ = _enter(fn, (sequence[i],), stack)
+                        value = ast
+                    else:
+                        value = mal_types.List(values)
+                elif kind == _K_SWAP:
+                    frame[1].val = value
+                elif kind == _K_MEMO:
+                    frame[1](frame[2], value)
+                elif kind == _K_COND:
+                    _, ast, i, environ = frame
+                    if value is not None and value is not False:
+                        ast = ast[i + 1]
+                        evaluating = True
+                    elif i + 2 < len(ast):
+                        if i + 3 == len(ast):
+                            raise exceptions.MalExceptionError("odd number of forms to cond")
+                        stack.append((_K_COND, ast, i + 2, environ))
+                        ast = ast[i + 2]
+                        evaluating = True
+                    else:
+                        value = None
+                elif kind == _K_OR or kind == _K_AND:
+                    _, ast, i, environ = frame
+                    if (value is None or value is False) == (kind == _K_OR):
+                        i += 1
+                        if i < len(ast) - 1:
+                            stack.append((kind, ast, i, environ))
+                        ast = ast[i]
+                        evaluating = True
+                elif kind == _K_WHEN:
+                    _, ast, environ = frame
+                    if value is None or value is False or len(ast) < 3:
+                        value = None
+                    else:
+                        if len(ast) > 3:
+                            stack.append((_K_DO, ast, 3, environ))
+                        ast = ast[2]
+                        evaluating = True
+        except Exception as e:
+            while stack and stack[-1][0] != _K_TRY:
+                stack.pop()
+            if not stack:
+                raise
+            _, symbol, body, environ = stack.pop()
+            err = e.val if isinstance(e, exceptions.MalExceptionError) else str(e)
+            ast, environ = body, env.Env(environ, (symbol,), (err,))
+            evaluating = True
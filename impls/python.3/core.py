@@ -1,4 +1,5 @@
 #!/bin/usr/env python
+import collections
 import copy
 import functools
 import itertools
@@ -17,6 +18,8 @@ def _count(exp) -> int:
     return len(exp) if exp is not None else 0
 
 def _isempty(lst: mal_types.List) -> bool:
+    if isinstance(lst, mal_types.LazySeq):
+        return not lst
     return lst is None or len(lst) == 0
 
 def _pr_str(*args) -> str:
@@ -58,15 +61,10 @@ def _eq_dicts(a, b):
     assert isinstance(a, mal_types.HashMap), "a is not a HashMap"
     assert isinstance(b, mal_types.HashMap), "b is not a HashMap"
 
-    a_keys = sorted(a.keys())
-    b_keys = sorted(b.keys())
-
-    if len(a_keys) != len(b_keys):
+    if len(a) != len(b):
         return False
-    for a_key, b_key in zip(a_keys, b_keys):
-        if a_key != b_key:
-            return False
-        if not _eq(a[a_key], b[b_key]):
+    for key, value in a.items():
+        if key not in b or not _eq(value, b[key]):
             return False
     return True
 
@@ -147,7 +145,9 @@ def _greater_than_eq(a, b, *_) -> bool:
     return a >= b
 
 def _cons(arg, sequence: mal_types.Sequence):
-    if issequence(sequence):
+    if isinstance(sequence, mal_types.LazySeq):
+        return sequence.cons(arg)
+    elif issequence(sequence):
         return mal_types.List((arg,) + sequence)
     else:
         raise exceptions.NotASequenceError(
@@ -155,6 +155,8 @@ def _cons(arg, sequence: mal_types.Sequence):
         )
 
 def _concat(*args) -> mal_types.List:
+    if any(isinstance(arg, mal_types.LazySeq) for arg in args):
+        return mal_types.LazySeq.from_iterable(itertools.chain(*args))
     return mal_types.List(itertools.chain(*args))
 
 def _nth(sequence: mal_types.Sequence, i: int):
@@ -168,6 +170,8 @@ def _nth(sequence: mal_types.Sequence, i: int):
 def _first(sequence: mal_types.Sequence):
     if sequence is not None and not issequence(sequence):
         raise exceptions.NotASequenceError(sequence)
+    elif isinstance(sequence, mal_types.LazySeq):
+        return sequence.first()
     return sequence[0] if sequence and len(sequence) > 0 else None
 
 def _rest(sequence: mal_types.Sequence):
@@ -175,6 +179,8 @@ def _rest(sequence: mal_types.Sequence):
         return mal_types.List()
     elif not issequence(sequence):
         raise exceptions.NotASequenceError(sequence)
+    elif isinstance(sequence, mal_types.LazySeq):
+        return sequence.rest()
     if len(sequence) == 0:
         return mal_types.List()
     return mal_types.List(sequence[1:])
@@ -190,6 +196,8 @@ def _map(func: callable, sequence: mal_types.Sequence) -> mal_types.List:
         raise exceptions.NotASequenceError(
             f"Expected a sequence (list or vector0) but found a '{type(sequence)}' instead"
         )
+    elif isinstance(sequence, mal_types.LazySeq):
+        return mal_types.LazySeq.from_iterable(map(func, sequence))
     return mal_types.List(map(func, sequence))
 
 def _args_into_map(hash_map: mal_types.HashMap, *args) -> mal_types.HashMap:
@@ -204,10 +212,26 @@ def args_to_map(*args) -> mal_types.HashMap:
     new_map = mal_types.HashMap()
     return _args_into_map(new_map, *args)
 
-def _assoc(hash_map: mal_types.HashMap, *args) -> mal_types.HashMap:
-    new_map = mal_types.HashMap({**hash_map})
+def _assoc(collection, *args):
+    if isinstance(collection, mal_types.Vector):
+        return _assoc_vector(collection, *args)
+    new_map = mal_types.HashMap({**collection})
     return _args_into_map(new_map, *args)
 
+def _assoc_vector(vector: mal_types.Vector, *args) -> mal_types.Vector:
+    if len(args) % 2 != 0:
+        raise exceptions.WrongArgNumberError(len(args))
+    for i in range(0, len(args), 2):
+        if not _is_num(args[i]):
+            raise exceptions.MalTypeError(type(args[i]), int)
+        if args[i] < 0:
+            raise exceptions.IndexOutOfRangeError("assoc: index out of range")
+        try:
+            vector = vector.assoc(args[i], args[i + 1])
+        except IndexError as e:
+            raise exceptions.IndexOutOfRangeError("assoc: index out of range") from e
+    return vector
+
 def _dissoc(hash_map: mal_types.HashMap, *args) -> mal_types.HashMap:
     new_map = mal_types.HashMap({**hash_map})
     for arg in args:
@@ -289,7 +313,9 @@ def _with_meta(obj, meta):
     return new_obj
 
 def _seq(seq):
-    if seq is None or len(seq) == 0:
+    if isinstance(seq, mal_types.LazySeq):
+        return seq if seq else None
+    elif seq is None or len(seq) == 0:
         return None
     elif isinstance(seq, mal_types.List):
         return seq
@@ -301,7 +327,139 @@ def _conj(collection, *args):
     if isinstance(collection, mal_types.List):
         return mal_types.List(args[::-1] + collection)
     if isinstance(collection, mal_types.Vector):
-        return mal_types.Vector(collection + args)
+        return collection.extend(args)
+    if isinstance(collection, mal_types.LazySeq):
+        for arg in args:
+            collection = collection.cons(arg)
+        return collection
+
+def _truthy(obj) -> bool:
+    return obj is not None and obj is not False
+
+def _iter(coll):
+    return iter(coll) if coll is not None else iter(())
+
+def _range(*args) -> mal_types.LazySeq:
+    return mal_types.LazySeq.from_iterable(range(*args) if args else itertools.count())
+
+def _iterate(func: callable, value) -> mal_types.LazySeq:
+    def values(value):
+        while True:
+            yield value
+            value = func(value)
+    return mal_types.LazySeq.from_iterable(values(value))
+
+def _take(n: int, coll) -> mal_types.LazySeq:
+    return mal_types.LazySeq.from_iterable(itertools.islice(_iter(coll), n))
+
+def _drop(n: int, coll) -> mal_types.LazySeq:
+    return mal_types.LazySeq.from_iterable(itertools.islice(_iter(coll), n, None))
+
+def _filter(pred: callable, coll) -> mal_types.LazySeq:
+    return mal_types.LazySeq.from_iterable(x for x in _iter(coll) if _truthy(pred(x)))
+
+def _take_while(pred: callable, coll) -> mal_types.LazySeq:
+    return mal_types.LazySeq.from_iterable(
+        itertools.takewhile(lambda x: _truthy(pred(x)), _iter(coll))
+    )
+
+_MAX_SIZE = mal_types.Keyword("max-size")
+_TTL = mal_types.Keyword("ttl")
+
+def _memo_key(value):
+    kind = type(value)
+    if kind is int or kind is str or value is None:
+        return value
+    elif isinstance(value, mal_types.LazySeq):
+        raise TypeError("lazy seqs are not memoized")
+    elif isinstance(value, mal_types.Sequence):
+        return mal_types.Sequence, tuple(_memo_key(item) for item in value)
+    elif isinstance(value, mal_types.HashMap):
+        return mal_types.HashMap, frozenset(
+            (_memo_key(k), _memo_key(v)) for k, v in value.items()
+        )
+    # bools, symbols and keywords compare equal to ints and tuples
+    return kind, value
+
+def _memoize(func: callable, options: mal_types.HashMap = None) -> callable:
+    options = options or {}
+    max_size = options.get(_MAX_SIZE)
+    ttl = options.get(_TTL)
+    for option in (max_size, ttl):
+        if option is not None and not _is_num(option):
+            raise exceptions.MalTypeError(int, type(option))
+    cache = collections.OrderedDict()
+    # (expiry, key) in the order entries were stored, which with a fixed
+    # ttl is also the order they expire in
+    expiries = collections.deque()
+    stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def lookup(args):
+        """Returns (True, value) on a hit, else (False, key), where key
+        is None when args can't be memoized."""
+        try:
+            key = tuple(_memo_key(arg) for arg in args)
+            entry = cache.get(key)
+        except TypeError:
+            return False, None
+        if entry is not None:
+            value, expires = entry
+            if expires is None or time.monotonic() < expires:
+                stats["hits"] += 1
+                cache.move_to_end(key)
+                return True, value
+            del cache[key]
+            stats["evictions"] += 1
+        stats["misses"] += 1
+        return False, key
+
+    def store(key, value):
+        if ttl is None:
+            cache[key] = value, None
+        else:
+            now = time.monotonic()
+            # A hit moves its entry to the end of cache without renewing
+            # it, so cache is not in expiry order; expiries is. Sweeping
+            # it drops every expired entry, even for keys that are never
+            # asked for again. A key already dropped or stored again
+            # since has a different entry and is left alone.
+            while expiries and expiries[0][0] <= now:
+                expires, old = expiries.popleft()
+                entry = cache.get(old)
+                if entry is not None and entry[1] == expires:
+                    del cache[old]
+                    stats["evictions"] += 1
+            expires = now + ttl / 1000
+            cache[key] = value, expires
+            expiries.append((expires, key))
+        if max_size is not None:
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+                stats["evictions"] += 1
+        return value
+
+    def memoized(*args):
+        hit, found = lookup(args)
+        if hit:
+            return found
+        value = func(*args)
+        if found is not None:
+            store(found, value)
+        return value
+
+    memoized.__meta__ = None
+    memoized.__memo__ = cache, stats
+    # lets the continuation machine call func without nesting a python frame
+    memoized.__memoized__ = func, lookup, store
+    return memoized
+
+def _memoize_stats(func: callable) -> mal_types.HashMap:
+    if not hasattr(func, "__memo__"):
+        raise exceptions.MalTypeError(_memoize, type(func))
+    cache, stats = func.__memo__
+    result = mal_types.HashMap((mal_types.Keyword(k), v) for k, v in stats.items())
+    result[mal_types.Keyword("size")] = len(cache)
+    return result
 
 def _is_num(obj) -> bool:
     return isinstance(obj, int) and not isinstance(obj, bool)
@@ -312,6 +470,34 @@ def _is_func(obj) -> bool:
 def _is_macro(obj) -> bool:
     return getattr(obj, "__is_macro__", False)
 
+NATIVE_FORMS = frozenset(("cond", "or", "and", "when", "->", "->>"))
+_native_bindings = {}
+_UNBOUND = object()
+
+def record_native_forms(environ) -> None:
+    """Remember what the NATIVE_FORMS names are bound to in environ once
+    init_env is done, such as the cond macro."""
+    _native_bindings.clear()
+    for name in NATIVE_FORMS:
+        symbol = mal_types.Symbol(name)
+        found = environ.find(symbol)
+        if found is not None:
+            _native_bindings[symbol] = found.data[symbol]
+
+def native_form(ast: mal_types.List, environ):
+    """The head of ast if the evaluators should run it as a native form:
+    one of NATIVE_FORMS that is unbound or still has its init_env binding.
+    A macro or function the user or lib/ binds to the name takes over."""
+    if len(ast) == 0:
+        return None
+    head = ast[0]
+    if type(head) is not mal_types.Symbol or head.name not in NATIVE_FORMS:
+        return None
+    found = environ.find(head)
+    if found is not None and found.data[head] is not _native_bindings.get(head, _UNBOUND):
+        return None
+    return head
+
 def py_to_mal(obj):
     if isinstance(obj, list) or isinstance(obj, tuple):
         return mal_types.List(obj)
@@ -381,4 +567,12 @@ ns = {
     "seq":_seq,
     "conj":_conj,
     "macro?":_is_macro,
+    "range":_range,
+    "iterate":_iterate,
+    "take":_take,
+    "drop":_drop,
+    "filter":_filter,
+    "take-while":_take_while,
+    "memoize":_memoize,
+    "memoize-stats":_memoize_stats,
 }
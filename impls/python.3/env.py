@@ -1,4 +1,6 @@
 #!/bin/usr/env python
+import weakref
+
 import exceptions
 import mal_types
 
@@ -8,10 +10,11 @@ class Env:
     def __init__(self, outer=None, binds=None, exprs=None):
         self.outer = outer
         self.data = {}
+        self._watchers = None
         
         if binds:
             for i in range(len(binds)):
-                if binds[i] == _VARARGS:
+                if binds[i] is _VARARGS:
                     self.set(binds[i+1], exprs[i:])
                     break
                 else:
@@ -21,6 +24,14 @@ class Env:
         if not isinstance(key, mal_types.Symbol):
             raise exceptions.NotASymbolError(key)
         self.data[key] = value
+        if self._watchers is not None and key in self._watchers:
+            for watcher in self._watchers.pop(key):
+                watcher.invalidate()
+
+    def watch(self, key: mal_types.Symbol, watcher) -> None:
+        if self._watchers is None:
+            self._watchers = {}
+        self._watchers.setdefault(key, weakref.WeakSet()).add(watcher)
 
     def find(self, key: mal_types.Symbol):
         if key in self.data:
@@ -0,0 +1,352 @@
+#!/bin/usr/env python
+import functools
+import typing
+
+import core
+import mal_types
+
+THRESHOLD = 50
+MAX_DEOPTS = 3
+
+_IF = mal_types.Symbol("if")
+_LET = mal_types.Symbol("let*")
+_DO = mal_types.Symbol("do")
+_QUOTE = mal_types.Symbol("quote")
+_VARARGS = mal_types.Symbol("&")
+
+
+class TailCall(typing.NamedTuple):
+    fn: typing.Callable
+    args: tuple
+
+
+class Unsupported(Exception):
+    pass
+
+
+def tail(fn, args: tuple):
+    if hasattr(fn, "__ast__"):
+        return TailCall(fn, args)
+    return fn(*args)
+
+
+@functools.lru_cache(maxsize=None)
+def _inline_ops() -> dict:
+    # Two-argument core functions whose python operator gives the same
+    # result; _add is sum(args), which starts from 0.
+    return {
+        core._less_than: ("({} < {})", True),
+        core._less_than_eq: ("({} <= {})", True),
+        core._greater_than: ("({} > {})", True),
+        core._greater_than_eq: ("({} >= {})", True),
+        core._add: ("(0 + {} + {})", False),
+        core._sub: ("({} - {})", False),
+        core._mul: ("({} * {})", False),
+        core._div: ("({} // {})", False),
+    }
+
+
+class Tier:
+    def __init__(self, fn, ast, environ, params, fallback) -> None:
+        self.fn = fn
+        self.ast = ast
+        self.environ = environ
+        self.params = params
+        self.fallback = fallback
+        self.calls = 0
+        self.deopts = 0
+        self.code = None
+        self._invalid = None
+
+    def entry(self):
+        if self.code is None:
+            self.calls += 1
+            if self.calls == THRESHOLD:
+                self.code = self._compile()
+        return self.code
+
+    def invalidate(self) -> None:
+        if self._invalid is not None:
+            self._invalid[0] = True
+        self.code = None
+        self._invalid = None
+        self.deopts += 1
+        self.calls = THRESHOLD if self.deopts >= MAX_DEOPTS else 0
+
+    def _compile(self):
+        try:
+            compiler = _Compiler(self.fn, self.environ)
+            code, invalid = compiler.compile(self.ast, self.params, self.fallback)
+        except Unsupported:
+            return None
+        self._invalid = invalid
+        for environ, symbol in compiler.deps:
+            environ.watch(symbol, self)
+        return code
+
+
+class _Compiler:
+    def __init__(self, fn, environ) -> None:
+        self.fn = fn
+        self.environ = environ
+        self.consts = []
+        self.const_names = {}
+        self.deps = set()
+        self.lines = []
+        self.n_locals = 0
+        self.params = None
+        self.variadic = False
+        self.may_tail_call = False
+
+    def compile(self, ast, params, fallback):
+        scope = self._bind_params(params)
+        body = self.lines
+        self.stmt(ast, scope, 3)
+        args = ", ".join(self.params)
+        if self.variadic:
+            signature = ", ".join(self.params[:-1] + ["*" + self.params[-1]])
+            fallback_args = f"({''.join(p + ', ' for p in self.params[:-1])}) + {self.params[-1]}"
+        else:
+            signature = ", ".join(self.params + ["*_"])
+            fallback_args = f"({args}{',' if len(self.params) == 1 else ''})"
+        self.lines = []
+        self._emit(1, f"def _jit({signature}):")
+        if self.variadic:
+            self._emit(2, f"{self.params[-1]} = _List({self.params[-1]})")
+        self._emit(2, "while True:")
+        self._emit(3, f"if _invalid[0]: return _fallback({fallback_args})")
+        self.lines.extend(body)
+        if self.may_tail_call:
+            self._emit(1, "def _selfcall(*args):")
+            self._emit(2, "return _force(_jit(*args))")
+        else:
+            self._emit(1, "_selfcall = _jit")
+        self._emit(1, "return _jit")
+        names = ", ".join(["_invalid", "_fallback"] + [n for n, _ in self.consts])
+        source = f"def _factory({names}):\n" + "\n".join(self.lines) + "\n"
+        namespace = {
+            "_List": mal_types.List,
+            "_Vector": mal_types.Vector,
+            "_HashMap": mal_types.HashMap,
+            "_TailCall": TailCall,
+            "_tail": tail,
+            "_force": force,
+        }
+        exec(compile(source, "<mal jit>", "exec"), namespace)
+        invalid = [False]
+        code = namespace["_factory"](invalid, fallback, *(v for _, v in self.consts))
+        return code, invalid
+
+    def _bind_params(self, params) -> dict:
+        scope = {}
+        self.params = []
+        for i, param in enumerate(params):
+            if param is _VARARGS:
+                if i != len(params) - 2:
+                    raise Unsupported()
+                self.variadic = True
+                continue
+            if not isinstance(param, mal_types.Symbol):
+                raise Unsupported()
+            scope[param] = f"_p{len(self.params)}"
+            self.params.append(scope[param])
+        return scope
+
+    def _emit(self, indent: int, line: str) -> None:
+        self.lines.append("    " * indent + line)
+
+    def _local(self) -> str:
+        self.n_locals += 1
+        return f"_l{self.n_locals}"
+
+    def const(self, value) -> str:
+        key = id(value)
+        if key not in self.const_names:
+            name = f"_k{len(self.consts)}"
+            self.consts.append((name, value))
+            self.const_names[key] = name
+        return self.const_names[key]
+
+    def resolve(self, symbol, scope):
+        if symbol in scope:
+            return scope[symbol], None
+        environ = self.environ
+        while environ is not None and symbol not in environ.data:
+            self.deps.add((environ, symbol))
+            environ = environ.outer
+        if environ is None:
+            raise Unsupported()
+        self.deps.add((environ, symbol))
+        value = environ.data[symbol]
+        return self.const(value), value
+
+    def _special(self, ast):
+        if len(ast) > 0 and isinstance(ast[0], mal_types.Symbol):
+            head = ast[0]
+            if head in (_IF, _LET, _DO, _QUOTE):
+                return head
+            if head.name in _UNSUPPORTED_FORMS:
+                raise Unsupported()
+        return None
+
+    def _bindings(self, ast, scope):
+        if len(ast) < 3 or not core.issequence(ast[1]) or len(ast[1]) % 2 != 0:
+            raise Unsupported()
+        scope = dict(scope)
+        assigns = []
+        for i in range(0, len(ast[1]), 2):
+            if not isinstance(ast[1][i], mal_types.Symbol):
+                raise Unsupported()
+            value = self.expr(ast[1][i + 1], scope)
+            scope[ast[1][i]] = self._local()
+            assigns.append((scope[ast[1][i]], value))
+        return scope, assigns
+
+    def test(self, ast, scope) -> str:
+        call = self._inline(ast, scope)
+        if call is not None and call[1]:
+            return call[0]
+        t = self._local()
+        return f"(({t} := {self.expr(ast, scope)}) is not None and {t} is not False)"
+
+    def _inline(self, ast, scope):
+        if (
+            not isinstance(ast, mal_types.List)
+            or len(ast) != 3
+            or not isinstance(ast[0], mal_types.Symbol)
+            or self._special(ast) is not None
+        ):
+            return None
+        if ast[0] in scope:
+            return None
+        _, value = self.resolve(ast[0], scope)
+        try:
+            template, is_bool = _inline_ops()[value]
+        except (KeyError, TypeError):
+            return None
+        return template.format(*(self.expr(arg, scope) for arg in ast[1:])), is_bool
+
+    def _head(self, ast, scope):
+        head = ast[0]
+        if isinstance(head, mal_types.Symbol):
+            name, value = self.resolve(head, scope)
+            if getattr(value, "__is_macro__", False):
+                raise Unsupported()
+            return name, value
+        return self.expr(head, scope), None
+
+    def _args(self, ast, scope) -> list:
+        return [self.expr(arg, scope) for arg in ast[1:]]
+
+    def _is_self_call(self, value, ast) -> bool:
+        if value is not self.fn:
+            return False
+        n_fixed = len(self.params) - self.variadic
+        return len(ast) - 1 == n_fixed or (self.variadic and len(ast) - 1 > n_fixed)
+
+    def expr(self, ast, scope) -> str:
+        if isinstance(ast, mal_types.Symbol):
+            return self.resolve(ast, scope)[0]
+        elif isinstance(ast, mal_types.List):
+            if len(ast) == 0:
+                return self.const(ast)
+            special = self._special(ast)
+            if special is _IF:
+                if len(ast) < 3:
+                    raise Unsupported()
+                else_ = self.expr(ast[3], scope) if len(ast) > 3 else "None"
+                return f"({self.expr(ast[2], scope)} if {self.test(ast[1], scope)} else {else_})"
+            elif special is _LET:
+                scope, assigns = self._bindings(ast, scope)
+                items = "".join(f"({name} := {value}), " for name, value in assigns)
+                return f"({items}{self.expr(ast[2], scope)})[-1]"
+            elif special is _DO:
+                if len(ast) < 2:
+                    raise Unsupported()
+                return f"({''.join(self.expr(x, scope) + ', ' for x in ast[1:])})[-1]"
+            elif special is _QUOTE:
+                return self.const(ast[-1])
+            inline = self._inline(ast, scope)
+            if inline is not None:
+                return inline[0]
+            name, value = self._head(ast, scope)
+            args = ", ".join(self._args(ast, scope))
+            if self._is_self_call(value, ast):
+                return f"_selfcall({args})"
+            return f"{name}({args})"
+        elif isinstance(ast, mal_types.Vector):
+            return f"_Vector(({''.join(self.expr(x, scope) + ', ' for x in ast)}))"
+        elif isinstance(ast, mal_types.HashMap):
+            items = ", ".join(f"{self.const(k)}: {self.expr(v, scope)}" for k, v in ast.items())
+            return f"_HashMap({{{items}}})"
+        elif isinstance(ast, int) or ast is None:
+            return repr(ast)
+        return self.const(ast)
+
+    def stmt(self, ast, scope, indent: int) -> None:
+        special = self._special(ast) if isinstance(ast, mal_types.List) else None
+        if special is _IF:
+            if len(ast) < 3:
+                raise Unsupported()
+            self._emit(indent, f"if {self.test(ast[1], scope)}:")
+            self.stmt(ast[2], scope, indent + 1)
+            self._emit(indent, "else:")
+            if len(ast) > 3:
+                self.stmt(ast[3], scope, indent + 1)
+            else:
+                self._emit(indent + 1, "return None")
+        elif special is _LET:
+            scope, assigns = self._bindings(ast, scope)
+            for name, value in assigns:
+                self._emit(indent, f"{name} = {value}")
+            self.stmt(ast[2], scope, indent)
+        elif special is _DO:
+            if len(ast) < 2:
+                raise Unsupported()
+            for x in ast[1:-1]:
+                self._emit(indent, self.expr(x, scope))
+            self.stmt(ast[-1], scope, indent)
+        elif special is None and isinstance(ast, mal_types.List) and len(ast) > 0:
+            self._tail_call(ast, scope, indent)
+        else:
+            self._emit(indent, f"return {self.expr(ast, scope)}")
+
+    def _tail_call(self, ast, scope, indent: int) -> None:
+        inline = self._inline(ast, scope)
+        if inline is not None:
+            self._emit(indent, f"return {inline[0]}")
+            return
+        name, value = self._head(ast, scope)
+        args = self._args(ast, scope)
+        if self._is_self_call(value, ast):
+            n_fixed = len(self.params) - self.variadic
+            values = args[:n_fixed]
+            if self.variadic:
+                values.append(f"_List(({''.join(a + ', ' for a in args[n_fixed:])}))")
+            self._emit(indent, f"{''.join(p + ', ' for p in self.params)}= {''.join(v + ', ' for v in values)}")
+            self._emit(indent, "continue")
+        elif value is None:
+            self.may_tail_call = True
+            self._emit(indent, f"return _tail({name}, ({''.join(a + ', ' for a in args)}))")
+        elif hasattr(value, "__ast__"):
+            self.may_tail_call = True
+            self._emit(indent, f"return _TailCall({name}, ({''.join(a + ', ' for a in args)}))")
+        else:
+            self._emit(indent, f"return {name}({', '.join(args)})")
+
+
+_UNSUPPORTED_FORMS = frozenset((
+    "def!", "fn*", "quasiquote", "defmacro!", "macroexpand",
+    "try*", "catch*", "py*", "py!*", ".",
+    "cond", "or", "and", "when", "->", "->>", "lazy-seq",
+))
+
+
+def force(result):
+    while type(result) is TailCall:
+        fn, args = result
+        code = fn.__tier__.entry()
+        if code is None:
+            return fn(*args)
+        result = code(*args)
+    return result
@@ -1,37 +1,163 @@
 #!/bin/usr/env python
 import collections
-import typing
+import itertools
+import weakref
 
 
-class Sequence(tuple):
-    def __add__(self, rhs):
-        return Sequence(super().__add__(rhs))
+class Sequence:
+    __slots__ = ()
 
-    def __getitem__(self, key):
-        if isinstance(key, slice):
-            return Sequence(super().__getitem__(key))
-        else:
-            return super().__getitem__(key)
 
-    def __getslice__(self, *args):
-        return Sequence(super().__getslice__(*args))
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+
+def _new_path(level: int, node: list) -> list:
+    while level > 0:
+        node = [node]
+        level -= _BITS
+    return node
 
 
 class Vector(Sequence):
-    def __add__(self, rhs):
-        return Vector(super().__add__(rhs))
+    """Persistent vector: a 32-way trie of full leaves plus a tail buffer.
+
+    Nodes are python lists that are never mutated once shared, so conj,
+    assoc and slicing copy only the path they touch.
+    """
+
+    def __init__(self, items=()) -> None:
+        items = list(items)
+        count = len(items)
+        tail_offset = ((count - 1) >> _BITS) << _BITS if count else 0
+        nodes = [items[i:i + _WIDTH] for i in range(0, tail_offset, _WIDTH)]
+        shift = _BITS
+        while len(nodes) > _WIDTH:
+            nodes = [nodes[i:i + _WIDTH] for i in range(0, len(nodes), _WIDTH)]
+            shift += _BITS
+        self._count = count
+        self._shift = shift
+        self._root = nodes
+        self._tail = items[tail_offset:]
+
+    @classmethod
+    def _make(cls, count: int, shift: int, root: list, tail: list) -> "Vector":
+        vector = cls.__new__(cls)
+        vector._count = count
+        vector._shift = shift
+        vector._root = root
+        vector._tail = tail
+        return vector
+
+    def _tail_offset(self) -> int:
+        return self._count - len(self._tail)
+
+    def _leaf(self, i: int) -> list:
+        if i >= self._tail_offset():
+            return self._tail
+        node = self._root
+        for level in range(self._shift, 0, -_BITS):
+            node = node[(i >> level) & _MASK]
+        return node
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("vector index out of range")
+        return i
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        for i in range(0, self._tail_offset(), _WIDTH):
+            yield from self._leaf(i)
+        yield from self._tail
+
+    def __reversed__(self):
+        for i in range(self._count - 1, -1, -1):
+            yield self[i]
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            return Vector(super().__getitem__(key))
+            return Vector(self[i] for i in range(*key.indices(self._count)))
+        i = self._index(key)
+        return self._leaf(i)[i & _MASK]
+
+    def conj(self, value) -> "Vector":
+        count, shift = self._count, self._shift
+        if len(self._tail) < _WIDTH:
+            return Vector._make(count + 1, shift, self._root, self._tail + [value])
+        if (count >> _BITS) > (1 << shift):
+            root = [self._root, _new_path(shift, self._tail)]
+            shift += _BITS
         else:
-            return super().__getitem__(key)
+            root = self._push_tail(shift, self._root)
+        return Vector._make(count + 1, shift, root, [value])
 
-    def __getslice__(self, *args):
-        return Vector(super().__getslice__(*args))
+    def _push_tail(self, level: int, parent: list) -> list:
+        index = ((self._count - 1) >> level) & _MASK
+        node = parent[:]
+        if level == _BITS:
+            child = self._tail
+        elif index < len(parent):
+            child = self._push_tail(level - _BITS, parent[index])
+        else:
+            child = _new_path(level - _BITS, self._tail)
+        if index < len(node):
+            node[index] = child
+        else:
+            node.append(child)
+        return node
+
+    def assoc(self, i: int, value) -> "Vector":
+        if i == self._count:
+            return self.conj(value)
+        i = self._index(i)
+        if i >= self._tail_offset():
+            tail = self._tail[:]
+            tail[i & _MASK] = value
+            return Vector._make(self._count, self._shift, self._root, tail)
+        return Vector._make(
+            self._count, self._shift, self._assoc(self._shift, self._root, i, value), self._tail
+        )
+
+    def _assoc(self, level: int, node: list, i: int, value) -> list:
+        node = node[:]
+        if level == 0:
+            node[i & _MASK] = value
+        else:
+            index = (i >> level) & _MASK
+            node[index] = self._assoc(level - _BITS, node[index], i, value)
+        return node
+
+    def extend(self, values) -> "Vector":
+        vector = self
+        for value in values:
+            vector = vector.conj(value)
+        return vector
 
+    def __add__(self, rhs):
+        return self.extend(rhs)
+
+    def __radd__(self, lhs):
+        return lhs + type(lhs)(self)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (tuple, Sequence)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
 
-class List(Sequence):
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"Vector({list(self)!r})"
+
+
+class List(Sequence, tuple):
     def __add__(self, rhs):
         return List(super().__add__(rhs))
 
@@ -45,12 +171,174 @@ class List(Sequence):
         return List(super().__getslice__(*args))
 
 
-class Symbol(typing.NamedTuple):
-    name: str
+_CHUNK = 32
+
+
+class LazySeq(Sequence):
+    """Seq whose items are computed on demand.
 
+    A LazySeq calls its thunk once, the first time it is looked at, and
+    keeps the result as a list of items plus the LazySeq that follows them.
+    Sequences built from python iterables realize _CHUNK items at a time.
+    A LazySeq never refers back to the seqs before it, so walking a long
+    pipeline only keeps alive what the caller still holds.
+    """
 
-class Keyword(typing.NamedTuple):
-    keyword: str
+    def __init__(self, thunk) -> None:
+        self._thunk = thunk
+        self._items = None
+        self._start = 0
+        self._more = None
+
+    @classmethod
+    def from_iterable(cls, iterable) -> "LazySeq":
+        return _chunked(iter(iterable))
+
+    def _realize(self) -> None:
+        if self._items is not None:
+            return
+        # Follow thunks that return further unrealized seqs in a loop, so
+        # long chains of (lazy-seq (lazy-seq ...)) don't nest python frames.
+        pending = [self]
+        seq = self._thunk()
+        while True:
+            if isinstance(seq, LazySeq):
+                if seq._items is None:
+                    pending.append(seq)
+                    seq = seq._thunk()
+                    continue
+                if seq._start < len(seq._items) or seq._more is None:
+                    result = seq._items, seq._start, seq._more
+                    break
+                seq = seq._more
+            elif seq is None or len(seq) == 0:
+                result = (), 0, None
+                break
+            else:
+                result = seq, 0, None
+                break
+        for seq in pending:
+            seq._items, seq._start, seq._more = result
+            seq._thunk = None
+
+    def __bool__(self) -> bool:
+        self._realize()
+        return self._start < len(self._items)
+
+    def first(self):
+        self._realize()
+        return self._items[self._start] if self._start < len(self._items) else None
+
+    def rest(self):
+        self._realize()
+        if self._start + 1 < len(self._items):
+            return _cell(self._items, self._start + 1, self._more)
+        return self._more if self._more is not None else List()
+
+    def cons(self, value) -> "LazySeq":
+        return _cell((value,), 0, self)
+
+    def __iter__(self):
+        return _iterate(self)
+
+    def __len__(self) -> int:
+        count = 0
+        seq = self
+        while seq is not None:
+            seq._realize()
+            count += len(seq._items) - seq._start
+            seq = seq._more
+        return count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) or key < 0:
+            return List(tuple(self))[key]
+        seq = self
+        while seq is not None:
+            seq._realize()
+            i = seq._start + key
+            if i < len(seq._items):
+                return seq._items[i]
+            key = i - len(seq._items)
+            seq = seq._more
+        raise IndexError("lazy seq index out of range")
+
+    def __add__(self, rhs):
+        return List(tuple(self) + tuple(rhs))
+
+    def __radd__(self, lhs):
+        return lhs + type(lhs)(self)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (tuple, Sequence)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+
+def _cell(items, start: int, more) -> LazySeq:
+    seq = LazySeq(None)
+    seq._items, seq._start, seq._more = items, start, more
+    return seq
+
+
+def _chunked(iterator) -> LazySeq:
+    def thunk():
+        items = list(itertools.islice(iterator, _CHUNK))
+        return _cell(items, 0, _chunked(iterator) if len(items) == _CHUNK else None)
+    return LazySeq(thunk)
+
+
+def _iterate(seq):
+    while seq is not None:
+        seq._realize()
+        items, start, seq = seq._items, seq._start, seq._more
+        yield from itertools.islice(items, start, None)
+
+
+class Symbol:
+    """Interned: Symbol(name) hands back the one Symbol for that name, so
+    symbols compare and hash by identity. The table holds them weakly, so
+    a gensym is dropped once nothing refers to it."""
+
+    __slots__ = ("name", "__weakref__")
+    _table = weakref.WeakValueDictionary()
+
+    def __new__(cls, name: str) -> "Symbol":
+        symbol = cls._table.get(name)
+        if symbol is None:
+            symbol = super().__new__(cls)
+            symbol.name = name
+            cls._table[name] = symbol
+        return symbol
+
+    def __reduce__(self):
+        return Symbol, (self.name,)
+
+    def __repr__(self) -> str:
+        return f"Symbol(name={self.name!r})"
+
+
+class Keyword:
+    """Interned like Symbol."""
+
+    __slots__ = ("keyword", "__weakref__")
+    _table = weakref.WeakValueDictionary()
+
+    def __new__(cls, keyword: str) -> "Keyword":
+        result = cls._table.get(keyword)
+        if result is None:
+            result = super().__new__(cls)
+            result.keyword = keyword
+            cls._table[keyword] = result
+        return result
+
+    def __reduce__(self):
+        return Keyword, (self.keyword,)
+
+    def __repr__(self) -> str:
+        return f"Keyword(keyword={self.keyword!r})"
 
 
 class Atom:
@@ -0,0 +1,83 @@
+#!/bin/usr/env python
+import hashlib
+import os
+import pickle
+
+import reader
+
+# Bump when the reader or the types it builds change shape.
+_VERSION = 1
+
+
+def cache_dir() -> str:
+    """The directory named by MAL_CACHE_DIR; the cache is off when it is
+    unset or empty."""
+    return os.environ.get("MAL_CACHE_DIR", "")
+
+
+def _trusted(directory: str) -> bool:
+    # The entries are pickles, so only a directory that no one but this
+    # user can write to is read from or written to.
+    try:
+        st = os.stat(directory)
+    except FileNotFoundError:
+        return True
+    except OSError:
+        return False
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+
+def _cache_path(directory: str, path: str) -> str:
+    return os.path.join(directory, hashlib.sha1(path.encode()).hexdigest() + ".malc")
+
+
+def _load(cache_path: str):
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def _store(cache_path: str, entry) -> None:
+    # Written to a temporary file first so a concurrent reader never sees
+    # half an entry; a cache that cannot be written is skipped.
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+        with open(tmp, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def read_file(path: str) -> list:
+    """Return the top-level forms of the file at path.
+
+    The forms are cached in a .malc file keyed by the file's absolute path.
+    The entry is used as is while the file's mtime and size are unchanged,
+    and after checking the content hash when they are not."""
+    directory = cache_dir()
+    if not directory or not _trusted(directory):
+        with open(path) as f:
+            return reader.read_all(f.read())
+    path = os.path.abspath(path)
+    cache_path = _cache_path(directory, path)
+    stat = os.stat(path)
+    entry = _load(cache_path)
+    valid = (
+        isinstance(entry, tuple) and len(entry) == 6
+        and entry[0] == _VERSION and entry[1] == path
+    )
+    if valid and entry[2] == stat.st_mtime_ns and entry[3] == stat.st_size:
+        return entry[5]
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+    forms = entry[5] if valid and entry[4] == digest else reader.read_all(data.decode())
+    _store(cache_path, (_VERSION, path, stat.st_mtime_ns, stat.st_size, digest, forms))
+    return forms
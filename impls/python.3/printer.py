@@ -29,7 +29,7 @@ def pr_str(mal_datstruct, print_readably: bool) -> str:
         return f":{mal_datstruct.keyword}"
     elif isinstance(mal_datstruct, mal_types.Vector):
         return f"[{(' '.join(pr_str(item, print_readably) for item in mal_datstruct))}]"
-    elif isinstance(mal_datstruct, mal_types.List):
+    elif isinstance(mal_datstruct, (mal_types.List, mal_types.LazySeq)):
         return f"({(' '.join(pr_str(item, print_readably) for item in mal_datstruct))})"
     elif isinstance(mal_datstruct, int) and not isinstance(mal_datstruct, bool):
         return str(mal_datstruct)
@@ -44,6 +44,14 @@ def read_str(s):
     else:
         return tokens
 
+def read_all(s) -> list:
+    # trailing whitespace leaves more than the one empty match tokenize drops
+    reader = Reader([token for token in tokenize(s) if token])
+    forms = []
+    while reader._pos < len(reader._tokens):
+        forms.append(read_form(reader))
+    return forms
+
 def _is_parens_balanced(s: str) -> str:
     s = s[1:]
     s = s.replace(r'\\', '')
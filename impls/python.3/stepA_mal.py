@@ -4,9 +4,12 @@ import readline
 import sys
 #import traceback
 
+import cek
 import core
 import env
 import exceptions
+import jit
+import malc
 import mal_types
 import printer
 import reader
@@ -32,9 +35,9 @@ def is_pair(ast) -> bool:
 def quasiquote(ast):
     if not is_pair(ast):
         return core.args_to_list(_QUOTE, ast)
-    elif ast[0] == _UNQUOTE:
+    elif ast[0] is _UNQUOTE:
         return ast[1]
-    elif is_pair(ast[0]) and ast[0][0] == _SPLICE_UNQUOTE:
+    elif is_pair(ast[0]) and ast[0][0] is _SPLICE_UNQUOTE:
         return core.args_to_list(
             mal_types.Symbol("concat"),
             ast[0][1],
@@ -78,21 +81,56 @@ _CATCH = mal_types.Symbol("catch*")
 _PY = mal_types.Symbol("py*")
 _PY_STMNT = mal_types.Symbol("py!*")
 _DOT = mal_types.Symbol(".")
+_COND = mal_types.Symbol("cond")
+_OR = mal_types.Symbol("or")
+_AND = mal_types.Symbol("and")
+_WHEN = mal_types.Symbol("when")
+_THREAD_FIRST = mal_types.Symbol("->")
+_THREAD_LAST = mal_types.Symbol("->>")
+_LAZY_SEQ = mal_types.Symbol("lazy-seq")
+
+def thread(ast):
+    acc = ast[1]
+    for form in ast[2:]:
+        if not isinstance(form, mal_types.List):
+            acc = core.args_to_list(form, acc)
+        elif ast[0] is _THREAD_FIRST:
+            acc = form[:1] + (acc,) + form[1:]
+        else:
+            acc = form + (acc,)
+    return acc
 
 def _function(ast, environ, params):
     def fn(*args):
-        return EVAL(ast, env.Env(environ, params, mal_types.List(args)))
+        return _call(fn, args)
     fn.__meta__ = None
     fn.__ast__ = ast
     fn.__gen_env__ = lambda args: env.Env(environ, params, mal_types.List(args))
+    fn.__tier__ = jit.Tier(fn, ast, environ, params, lambda args: EVAL(ast, fn.__gen_env__(args)))
     return fn
 
+def _call(fn, args):
+    while True:
+        code = fn.__tier__.entry()
+        if code is None:
+            return EVAL(fn.__ast__, fn.__gen_env__(args))
+        result = code(*args)
+        if type(result) is not jit.TailCall:
+            return result
+        fn, args = result
+
 def EVAL(ast, environ: env.Env):
     while True:
         if not isinstance(ast, mal_types.List):
             return eval_ast(ast, environ)
 
-        ast = macroexpand(ast, environ)
+        # cond, or, and, when, -> and ->> are evaluated directly unless
+        # something other than init_env has rebound them.
+        native = core.native_form(ast, environ)
+        if native is None:
+            ast = macroexpand(ast, environ)
+            if isinstance(ast, mal_types.List):
+                native = core.native_form(ast, environ)
 
         if not isinstance(ast, mal_types.List):
             return eval_ast(ast, environ)
@@ -100,11 +138,11 @@ def EVAL(ast, environ: env.Env):
             return ast
 
         first_elem = ast[0]
-        if first_elem == _DEF:
+        if first_elem is _DEF:
             result = EVAL(ast[2], environ)
             environ.set(ast[1], result)
             return result
-        elif first_elem == _LET:
+        elif first_elem is _LET:
             let_env = env.Env(environ)
             args_list = ast[1]
             args_list_len = len(args_list)
@@ -114,14 +152,14 @@ def EVAL(ast, environ: env.Env):
                 let_env.set(args_list[i], EVAL(args_list[i+1], let_env))
             ast = ast[2]
             environ = let_env
-        elif first_elem == _DO:
+        elif first_elem is _DO:
             eval_ast(ast[1:-1], environ)
             ast = ast[-1]
-        elif first_elem == _QUOTE:
+        elif first_elem is _QUOTE:
             return ast[-1]
-        elif first_elem == _QUASIQUOTE:
+        elif first_elem is _QUASIQUOTE:
             ast = quasiquote(ast[1])
-        elif first_elem == _IF:
+        elif first_elem is _IF:
             if len(ast) < 3:
                 raise exceptions.MalSyntaxError("Error: missing body")
             cond_ = EVAL(ast[1], environ)
@@ -131,12 +169,12 @@ def EVAL(ast, environ: env.Env):
                 ast = ast[3]
             else:
                 ast = None
-        elif first_elem == _TRY:
+        elif first_elem is _TRY:
             if (
                 len(ast) < 3
                 or not isinstance(ast[2], mal_types.List)
                 or len(ast[2]) < 3
-                or ast[2][0] != _CATCH
+                or ast[2][0] is not _CATCH
             ):
                 return EVAL(ast[1], environ)
             err = None
@@ -148,24 +186,61 @@ def EVAL(ast, environ: env.Env):
                 err = str(e)
             catch_env = env.Env(environ, (ast[2][1],), (err,))
             return EVAL(ast[2][2], catch_env)
-        elif first_elem == _FN:
+        elif first_elem is _FN:
             if len(ast) < 3:
                 raise exceptions.MalSyntaxError("Syntax Error: Missing parameters or body")
             return _function(ast[2], environ, ast[1])
-        elif first_elem == _DEFMACRO:
+        elif first_elem is _DEFMACRO:
             fn = EVAL(ast[2], environ)
             fn = core.copy_func(fn)
             fn.__is_macro__ = True
             environ.set(ast[1], fn)
             return fn
-        elif first_elem == _MACROEXPAND:
+        elif first_elem is _MACROEXPAND:
             return macroexpand(ast[1], environ)
-        elif first_elem == _PY_STMNT:
+        elif first_elem is _PY_STMNT:
             exec(compile(ast[1], "", "single"), globals())
             return None
-        elif first_elem == _PY:
+        elif first_elem is _PY:
             return core.py_to_mal(eval(ast[1]))
-        elif first_elem == _DOT:
+        elif native is _COND:
+            for i in range(1, len(ast), 2):
+                if i + 1 == len(ast):
+                    raise exceptions.MalExceptionError("odd number of forms to cond")
+                cond_ = EVAL(ast[i], environ)
+                if cond_ is not None and cond_ is not False:
+                    ast = ast[i + 1]
+                    break
+            else:
+                return None
+        elif native is _OR:
+            if len(ast) == 1:
+                return None
+            for item in ast[1:-1]:
+                value = EVAL(item, environ)
+                if value is not None and value is not False:
+                    return value
+            ast = ast[-1]
+        elif native is _AND:
+            if len(ast) == 1:
+                return True
+            for item in ast[1:-1]:
+                value = EVAL(item, environ)
+                if value is None or value is False:
+                    return value
+            ast = ast[-1]
+        elif native is _WHEN:
+            cond_ = EVAL(ast[1], environ)
+            if cond_ is None or cond_ is False or len(ast) < 3:
+                return None
+            eval_ast(ast[2:-1], environ)
+            ast = ast[-1]
+        elif native is _THREAD_FIRST or native is _THREAD_LAST:
+            ast = thread(ast)
+        elif first_elem is _LAZY_SEQ:
+            body = core.args_to_list(_DO, *ast[1:])
+            return mal_types.LazySeq(lambda: EVAL(body, environ))
+        elif first_elem is _DOT:
             new_ast = eval_ast(ast[2:], environ)
             fn = eval(ast[1])
             return fn(*new_ast)
@@ -173,8 +248,16 @@ def EVAL(ast, environ: env.Env):
             new_ast = eval_ast(ast, environ)
             fn = new_ast[0]
             if hasattr(fn, "__ast__"):
+                args = new_ast[1:]
+                code = fn.__tier__.entry()
+                while code is not None:
+                    result = code(*args)
+                    if type(result) is not jit.TailCall:
+                        return result
+                    fn, args = result
+                    code = fn.__tier__.entry()
                 ast = fn.__ast__
-                environ = fn.__gen_env__(new_ast[1:])
+                environ = fn.__gen_env__(args)
             else:
                 return new_ast[0](*new_ast[1:])
 
@@ -183,31 +266,43 @@ def PRINT(tokens) -> str:
 
 repl_env = env.Env()
 
+# cek.EVAL when started with --cek
+evaluate = EVAL
+
 def rep(inpt):
-    return PRINT(EVAL(READ(inpt), repl_env))
+    return PRINT(evaluate(READ(inpt), repl_env))
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
+def load_file(path: str) -> None:
+    for form in malc.read_file(path):
+        evaluate(form, repl_env)
+
 def init_env() -> None:
     for k, v in core.ns.items():
         repl_env.set(mal_types.Symbol(k), v)
-    repl_env.set(mal_types.Symbol("eval"), lambda ast: EVAL(ast, repl_env))
+    repl_env.set(mal_types.Symbol("eval"), lambda ast: evaluate(ast, repl_env))
+    repl_env.set(mal_types.Symbol("load-file"), load_file)
     repl_env.set(mal_types.Symbol("*ARGV*"), mal_types.List(sys.argv[2:]))
     rep("(def! not (fn* (a) (if a false true)))")
-    rep('(def! load-file (fn* (f) (eval (read-string (str "(do " (slurp f) "\nnil)")))))')
     rep('(def! *host-language* "python")')
     rep(
         "(defmacro! cond (fn* (& xs) (if (> (count xs) 0) "
         "(list 'if (first xs) (if (> (count xs) 1) (nth xs 1) "
         "(throw \"odd number of forms to cond\")) (cons 'cond (rest (rest xs)))))))"
     )
+    core.record_native_forms(repl_env)
 
 def main():
+    global evaluate
+    if len(sys.argv) >= 2 and sys.argv[1] == "--cek":
+        del sys.argv[1]
+        evaluate = cek.EVAL
     init_env()
 
     if len(sys.argv) >= 2:
-        rep(f'(load-file "{sys.argv[1]}")')
+        load_file(sys.argv[1])
         sys.exit()
 
     rep('(println (str "Mal [" *host-language* "]"))')
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import malc
+import reader
+
+
+class TestMalc(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache = os.path.join(self._tmp.name, "cache")
+        self.source = os.path.join(self._tmp.name, "a.mal")
+        self.write("(def! a 1) (def! b [2 3])")
+        patcher = mock.patch.dict(os.environ, {"MAL_CACHE_DIR": self.cache})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, text: str, mtime_ns: int = None) -> None:
+        with open(self.source, "w") as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(self.source, ns=(mtime_ns, mtime_ns))
+
+    def entries(self) -> list:
+        if not os.path.isdir(self.cache):
+            return []
+        return [name for name in os.listdir(self.cache) if name.endswith(".malc")]
+
+    def read_without_reader(self):
+        with mock.patch.object(reader, "read_all", side_effect=AssertionError("parsed")):
+            return malc.read_file(self.source)
+
+    def test_malc_off_unless_cache_dir_set(self):
+        for value in (None, ""):
+            with mock.patch.dict(os.environ):
+                os.environ.pop("MAL_CACHE_DIR")
+                if value is not None:
+                    os.environ["MAL_CACHE_DIR"] = value
+                self.assertEqual(reader.read_all("(def! a 1) (def! b [2 3])"), malc.read_file(self.source))
+        self.assertEqual([], self.entries())
+
+    def test_malc_hit(self):
+        forms = malc.read_file(self.source)
+        self.assertEqual(1, len(self.entries()))
+        self.assertEqual(forms, self.read_without_reader())
+
+    def test_malc_cache_dir_is_private(self):
+        malc.read_file(self.source)
+        self.assertEqual(0o700, os.stat(self.cache).st_mode & 0o777)
+
+    def test_malc_edit_changing_size(self):
+        malc.read_file(self.source)
+        self.write("(def! a 10)")
+        self.assertEqual(reader.read_all("(def! a 10)"), malc.read_file(self.source))
+        self.assertEqual(reader.read_all("(def! a 10)"), self.read_without_reader())
+
+    def test_malc_touch_falls_back_to_digest(self):
+        forms = malc.read_file(self.source)
+        stat = os.stat(self.source)
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(forms, self.read_without_reader())
+
+    def test_malc_edit_keeping_size(self):
+        malc.read_file(self.source)
+        mtime_ns = os.stat(self.source).st_mtime_ns
+        self.write("(def! a 7) (def! b [2 3])", mtime_ns + 10**9)
+        self.assertEqual(reader.read_all("(def! a 7) (def! b [2 3])"), malc.read_file(self.source))
+
+    def test_malc_refuses_shared_directory(self):
+        os.mkdir(self.cache)
+        os.chmod(self.cache, 0o777)
+        self.assertEqual(reader.read_all("(def! a 1) (def! b [2 3])"), malc.read_file(self.source))
+        self.assertEqual([], self.entries())
+
+
+if __name__ == "__main__":
+    unittest.main()
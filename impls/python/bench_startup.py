@@ -0,0 +1,45 @@
+"""Time short runs that need lib/*.mal, loading the libraries from source
+on every run and restoring them from a snapshot, with and without the
+precompiled mal.pyz."""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LIBS = [os.path.join(HERE, "..", "lib", name + ".mal") for name in (
+    "load-file-once", "trivial", "reducers", "threading", "equality",
+    "memoize", "pprint", "protocols", "alias-hacks")]
+RUNS = 20
+
+def best(cmd):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    subprocess.run(["make", "-s", "-C", HERE, "mal.pyz"], check=True)
+    step_a, pyz = os.path.join(HERE, "stepA_mal.py"), os.path.join(HERE, "mal.pyz")
+    with tempfile.TemporaryDirectory() as tmp:
+        snap, script, loading = (os.path.join(tmp, name) for name in
+                                 ("lib.snap", "script.mal", "loading.mal"))
+        with open(script, "w") as f:
+            f.write("(prn (inc 41))\n")
+        with open(loading, "w") as f:
+            f.writelines('(load-file "%s")\n' % lib for lib in LIBS)
+            f.write("(prn (inc 41))\n")
+        subprocess.run([sys.executable, step_a, "--save-snapshot", snap] + LIBS, check=True)
+        for name, cmd in (
+                ("source, load libs", [sys.executable, step_a, loading]),
+                ("source, snapshot", [sys.executable, step_a, "--snapshot", snap, script]),
+                ("mal.pyz, load libs", [sys.executable, pyz, loading]),
+                ("mal.pyz, snapshot", [sys.executable, pyz, "--snapshot", snap, script])):
+            print("%-22s%8.1f ms" % (name, best(cmd) * 1000))
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-import copy, time
-from itertools import chain
+import sys
+import time
+from itertools import islice
 
 import mal_types as types
 from mal_types import MalException, List, Vector
@@ -18,25 +19,35 @@ def pr_str(*args):
 def do_str(*args):
     return "".join(map(lambda exp: printer._pr_str(exp, False), args))
 
+def read_all(file):
+    with open(file) as f:
+        return List(reader.read_file(f))
+
+def _pr_args(args, print_readably):
+    write = sys.stdout.write
+    for i, exp in enumerate(args):
+        if i: write(" ")
+        printer._pr_to(exp, write, print_readably)
+    write("\n")
+
 def prn(*args):
-    print(" ".join(map(lambda exp: printer._pr_str(exp, True), args)))
+    _pr_args(args, True)
     return None
 
 def println(*args):
-    print(" ".join(map(lambda exp: printer._pr_str(exp, False), args)))
+    _pr_args(args, False)
     return None
 
 
 # Hash map functions
 def assoc(src_hm, *key_vals):
-    hm = copy.copy(src_hm)
-    for i in range(0,len(key_vals),2): hm[key_vals[i]] = key_vals[i+1]
+    hm = src_hm
+    for i in range(0,len(key_vals),2): hm = hm.assoc(key_vals[i], key_vals[i+1])
     return hm
 
 def dissoc(src_hm, *keys):
-    hm = copy.copy(src_hm)
-    for key in keys:
-        hm.pop(key, None)
+    hm = src_hm
+    for key in keys: hm = hm.dissoc(key)
     return hm
 
 def get(hm, key):
@@ -55,9 +66,16 @@ def vals(hm): return types._list(*hm.values())
 # Sequence functions
 def coll_Q(coll): return sequential_Q(coll) or hash_map_Q(coll)
 
-def cons(x, seq): return List([x]) + List(seq)
+def cons(x, seq):
+    if types._list_Q(seq): return seq.cons(x)
+    else: return List(seq).cons(x)
 
-def concat(*lsts): return List(chain(*lsts))
+def concat(*lsts):
+    if not lsts: return List([])
+    res = lsts[-1] if types._list_Q(lsts[-1]) else List(lsts[-1])
+    for lst in reversed(lsts[:-1]):
+        res = res.prepend(lst)
+    return res
 
 def nth(lst, idx):
     if idx < len(lst): return lst[idx]
@@ -69,6 +87,7 @@ def first(lst):
 
 def rest(lst):
     if types._nil_Q(lst): return List([])
+    elif types._list_Q(lst): return lst[1:]
     else: return List(lst[1:])
 
 def empty_Q(lst): return len(lst) == 0
@@ -77,14 +96,24 @@ def count(lst):
     if types._nil_Q(lst): return 0
     else: return len(lst)
 
-def apply(f, *args): return f(*(list(args[0:-1])+args[-1]))
+def apply(f, *args): return f(*(list(args[0:-1])+list(args[-1])))
+
+def mapf(f, *lst):
+    if not lst: return map_xf(f)
+    return List.from_owned(list(map(f, lst[0])))
 
-def mapf(f, lst): return List(map(f, lst))
+def filterf(pred, *lst):
+    if not lst: return filter_xf(pred)
+    return List.from_owned([x for x in lst[0] or () if truthy(pred(x))])
+
+def take(n, *lst):
+    if not lst: return take_xf(n)
+    return List(islice(lst[0] or (), max(n, 0)))
 
 # retains metadata
 def conj(lst, *args):
     if types._list_Q(lst): 
-        new_lst = List(list(reversed(list(args))) + lst)
+        new_lst = lst.prepend(reversed(args))
     else:
         new_lst = Vector(lst + list(args))
     if hasattr(lst, "__meta__"):
@@ -97,11 +126,78 @@ def seq(obj):
     elif types._vector_Q(obj):
         return List(obj) if len(obj) > 0 else None
     elif types._string_Q(obj):
-        return List([c for c in obj]) if len(obj) > 0 else None
+        return List.from_owned([c for c in obj]) if len(obj) > 0 else None
     elif obj == None:
         return None
     else: throw ("seq: called on non-sequence")
 
+# Reducers
+def truthy(x): return x is not None and x is not False
+
+def caller(f):
+    # mal closures are entered through their analyzed body instead of the
+    # fn -> EVAL -> execute wrapper, once per element
+    body = getattr(f, '__body__', None)
+    if body is None: return f
+    gen_env = f.__gen_env__
+    return lambda *args: types.execute(body, gen_env(List(args)))
+
+def _reduce(step, acc, xs):
+    for x in xs or ():
+        acc = step(acc, x)
+        if types._reduced_Q(acc): return acc.val
+    return acc
+
+def reduce(f, *args):
+    if len(args) == 2:
+        return _reduce(caller(f), args[0], args[1])
+    xs = args[0]
+    if empty_Q(xs or ()): return f()
+    return _reduce(caller(f), xs[0], xs[1:])
+
+def foldr(f, init, xs):
+    step, acc = caller(f), init
+    for i in range(count(xs) - 1, -1, -1):
+        acc = step(xs[i], acc)
+        if types._reduced_Q(acc): return acc.val
+    return acc
+
+# A transducer takes a reducing step (acc, x) -> acc and returns another
+# one, so composing transducers stacks steps and a single pass over the
+# input runs them all without building intermediate collections.
+def map_xf(f):
+    f = caller(f)
+    return lambda step: lambda acc, x: step(acc, f(x))
+
+def filter_xf(pred):
+    pred = caller(pred)
+    return lambda step: lambda acc, x: step(acc, x) if truthy(pred(x)) else acc
+
+def take_xf(n):
+    def xf(step):
+        left = [n]
+        def take_step(acc, x):
+            if left[0] <= 0: return types._reduced(acc)
+            left[0] -= 1
+            acc = step(acc, x)
+            if left[0] <= 0 and not types._reduced_Q(acc):
+                acc = types._reduced(acc)
+            return acc
+        return take_step
+    return xf
+
+def comp(*fs):
+    fs = [caller(f) for f in reversed(fs)]
+    def composed(*args):
+        if not fs: return args[0]
+        res = fs[0](*args)
+        for f in fs[1:]: res = f(res)
+        return res
+    return composed
+
+def transduce(xf, f, init, xs):
+    return _reduce(caller(caller(xf)(caller(f))), init, xs)
+
 # Metadata functions
 def with_meta(obj, meta):
     new_obj = types._clone(obj)
@@ -146,6 +242,7 @@ ns = {
         'readline': lambda prompt: mal_readline.readline(prompt),
         'read-string': reader.read_str,
         'slurp': lambda file: open(file).read(),
+        'read-all': read_all,
         '<':  lambda a,b: a<b,
         '<=': lambda a,b: a<=b,
         '>':  lambda a,b: a>b,
@@ -179,6 +276,14 @@ ns = {
         'count': count,
         'apply': apply,
         'map': mapf,
+        'filter': filterf,
+        'take': take,
+        'reduce': reduce,
+        'reduced': types._reduced,
+        'reduced?': types._reduced_Q,
+        'foldr': foldr,
+        'comp': comp,
+        'transduce': transduce,
 
         'conj': conj,
         'seq': seq,
@@ -1,24 +1,52 @@
 # Environment
 
 class Env():
+    # counts the closures made so far; see set
+    closures = 0
+
     def __init__(self, outer=None, binds=None, exprs=None):
         self.data = {}
         self.outer = outer or None
+        # the outermost env (repl_env) carries a version stamp that is
+        # bumped whenever a binding that may have been cached changes
+        self.root = outer.root if outer else self
+        self.version = 0
+        self.created = Env.closures
 
         if binds:
-            for i in range(len(binds)):
-                if binds[i] == "&":
+            # iterating rather than indexing keeps a mal List's bounds
+            # checks off the per-call path
+            vals = iter(exprs)
+            for i, bind in enumerate(binds):
+                if bind == "&":
                     self.data[binds[i+1]] = exprs[i:]
                     break
                 else:
-                    self.data[binds[i]] = exprs[i]
+                    self.data[bind] = next(vals, None)
 
     def find(self, key):
-        if key in self.data: return self
-        elif self.outer:     return self.outer.find(key)
-        else:                return None
+        env = self
+        while env is not None:
+            if key in env.data: return env
+            env = env.outer
+        return None
 
     def set(self, key, value):
+        # rebinding a global, or shadowing one after the fact, changes
+        # what a cached global lookup should see
+        if self.outer is None or key in self.root.data:
+            self.root.version += 1
+        self.data[key] = value
+        return value
+
+    def bind(self, key, value):
+        # a let* binding. Unlike a def!, which may run on one call and
+        # not the next, it is made on every pass through its let*, so a
+        # site in the let* body never saw the global. Only a closure made
+        # since this env was can have looked the name up through it
+        # before and look it up again after.
+        if Env.closures != self.created and key in self.root.data:
+            self.root.version += 1
         self.data[key] = value
         return value
 
@@ -1,4 +1,5 @@
 import sys, copy, types as pytypes
+from itertools import islice
 
 # python 3.0 differences
 if sys.hexversion > 0x3000000:
@@ -46,9 +47,11 @@ def _clone(obj):
     #if type(obj) == type(lambda x:x):
     if type(obj) == pytypes.FunctionType:
         if obj.__code__:
-            return pytypes.FunctionType(
+            fn = pytypes.FunctionType(
                     obj.__code__, obj.__globals__, name = obj.__name__,
                     argdefs = obj.__defaults__, closure = obj.__closure__)
+            fn.__dict__.update(obj.__dict__)
+            return fn
         else:
             return pytypes.FunctionType(
                     obj.func_code, obj.func_globals, name = obj.func_name,
@@ -92,24 +95,117 @@ def _keyword_Q(exp):
         return False
 
 # Functions
+# Closures analyzed in tail position return a TailCall instead of growing
+# the python stack; execute runs them until a value comes back.
+class TailCall(object):
+    __slots__ = ('body', 'env')
+    def __init__(self, body, env):
+        self.body = body
+        self.env = env
+
+def execute(body, env):
+    res = body(env)
+    while type(res) is TailCall:
+        res = res.body(res.env)
+    return res
+
 def _function(Eval, Env, ast, env, params):
     def fn(*args):
         return Eval(ast, Env(env, params, List(args)))
     fn.__meta__ = None
     fn.__ast__ = ast
+    fn.__params__ = params
+    fn.__env__ = env
     fn.__gen_env__ = lambda args: Env(env, params, args)
     return fn
 def _function_Q(f):
     return callable(f)
 
 # lists
-class List(list):
-    def __add__(self, rhs): return List(list.__add__(self, rhs))
+# A List reads its elements backwards out of _items[_lo:_hi]. The python
+# list behind it may be shared with other Lists: rest and slices are new
+# bounds over the same array, so first, rest and nth are O(1). cons and
+# concat append to it when nothing has been pushed past _hi yet, which
+# makes cons onto a list built by cons O(1). Otherwise they copy, so
+# (cons x (rest xs)) is O(n): the slot past _hi still belongs to xs.
+class List(object):
+    __slots__ = ('_items', '_lo', '_hi', '__meta__')
+    def __init__(self, vals=()):
+        items = list(vals)
+        items.reverse()
+        self._items, self._lo, self._hi = items, 0, len(items)
+
+    @classmethod
+    def from_owned(cls, vals):
+        """Wrap a python list the caller has just built and gives up,
+        reversing it in place instead of copying it."""
+        vals.reverse()
+        return cls._view(vals, 0, len(vals))
+
+    @classmethod
+    def _view(cls, items, lo, hi):
+        lst = cls.__new__(cls)
+        lst._items, lst._lo, lst._hi = items, lo, hi
+        return lst
+
+    def __len__(self): return self._hi - self._lo
+    def __iter__(self):
+        items = self._items
+        n = len(items)
+        if self._hi == n:
+            if self._lo == 0: return reversed(items)
+            return islice(reversed(items), n - self._lo)
+        return islice(reversed(items), n - self._hi, n - self._lo)
     def __getitem__(self, i):
-        if type(i) == slice: return List(list.__getitem__(self, i))
-        elif i >= len(self): return None
-        else:                return list.__getitem__(self, i)
-    def __getslice__(self, *a): return List(list.__getslice__(self, *a))
+        if type(i) is int and 0 <= i < self._hi - self._lo:
+            return self._items[self._hi - 1 - i]
+        n = self._hi - self._lo
+        if type(i) == slice:
+            start, stop, step = i.indices(n)
+            if step != 1:
+                return List(list(self)[i])
+            if stop <= start:
+                return List()
+            return List._view(self._items, self._hi - stop, self._hi - start)
+        if i < 0: i += n
+        if i >= n:  return None
+        elif i < 0: raise IndexError("list index out of range")
+        return self._items[self._hi - 1 - i]
+    def __getslice__(self, i, j): return self[i:j]
+
+    def cons(self, x):
+        items, hi = self._items, self._hi
+        if hi != len(items):
+            items, hi = items[self._lo:hi], hi - self._lo
+            return List._view(items + [x], 0, hi + 1)
+        items.append(x)
+        return List._view(items, self._lo, hi + 1)
+
+    def prepend(self, vals):
+        """Return vals followed by this list, sharing this list's items."""
+        front = List(vals)._items
+        if not front: return self
+        items, lo, hi = self._items, self._lo, self._hi
+        if hi != len(items):
+            items, lo, hi = items[lo:hi], 0, hi - lo
+        items.extend(front)
+        return List._view(items, lo, hi + len(front))
+
+    def __add__(self, rhs):
+        if type(rhs) != List: rhs = List(rhs)
+        return rhs.prepend(self)
+    def __radd__(self, lhs): return lhs + type(lhs)(self)
+    def __eq__(self, other):
+        if not isinstance(other, (List, list, tuple)): return NotImplemented
+        if len(self) != len(other): return False
+        for a, b in zip(self, other):
+            if not a == b: return False
+        return True
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+    __hash__ = None
+    def __repr__(self): return 'List(%r)' % (list(self),)
 def _list(*vals): return List(vals)
 def _list_Q(exp):   return type(exp) == List
 
@@ -126,10 +222,259 @@ def _vector(*vals): return Vector(vals)
 def _vector_Q(exp): return type(exp) == Vector
 
 # Hash maps
-class Hash_Map(dict): pass
+# Persistent hash array mapped trie: every node holds up to 32 entries
+# selected by 5 bits of the key's hash, and an entry is either a
+# (key, value, seq) leaf or a child node. assoc/dissoc copy only the path
+# from the root to the changed entry, so older versions stay valid. seq
+# records insertion order, which iteration follows like a dict does.
+_HASH_BITS = 32
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+def _bitpos(h, shift): return 1 << ((h >> shift) & 0x1f)
+def _index(bitmap, bit): return bin(bitmap & (bit - 1)).count('1')
+
+class _Node(object):
+    __slots__ = ('bitmap', 'entries')
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def get(self, h, shift, key, default):
+        bit = _bitpos(h, shift)
+        if not self.bitmap & bit: return default
+        entry = self.entries[_index(self.bitmap, bit)]
+        if type(entry) is tuple:
+            return entry[1] if entry[0] == key else default
+        return entry.get(h, shift + 5, key, default)
+
+    def entry(self, h, shift, key):
+        # the (key, value, seq) leaf for key, or None
+        bit = _bitpos(h, shift)
+        if not self.bitmap & bit: return None
+        entry = self.entries[_index(self.bitmap, bit)]
+        if type(entry) is tuple:
+            return entry if entry[0] == key else None
+        return entry.entry(h, shift + 5, key)
+
+    def assoc(self, h, shift, key, val, seq):
+        # returns (node, added)
+        bit = _bitpos(h, shift)
+        idx = _index(self.bitmap, bit)
+        entries = self.entries
+        if not self.bitmap & bit:
+            return (_Node(self.bitmap | bit,
+                          entries[:idx] + ((key, val, seq),) + entries[idx:]),
+                    True)
+        entry = entries[idx]
+        if type(entry) is tuple:
+            if entry[0] == key:
+                if entry[1] is val: return self, False
+                new, added = (key, val, entry[2]), False
+            else:
+                new, added = _split(entry, _hash(entry[0]), h, shift + 5,
+                                    (key, val, seq)), True
+        else:
+            new, added = entry.assoc(h, shift + 5, key, val, seq)
+            if new is entry: return self, False
+        return (_Node(self.bitmap, entries[:idx] + (new,) + entries[idx+1:]),
+                added)
+
+    def without(self, h, shift, key):
+        # returns the new node, None when it became empty
+        bit = _bitpos(h, shift)
+        if not self.bitmap & bit: return self
+        idx = _index(self.bitmap, bit)
+        entry = self.entries[idx]
+        if type(entry) is tuple:
+            if entry[0] != key: return self
+            new = None
+        else:
+            new = entry.without(h, shift + 5, key)
+            if new is entry: return self
+            if new is not None and new.is_pair():
+                new = new.pair()
+        if new is None:
+            if self.bitmap == bit: return None
+            return _Node(self.bitmap ^ bit,
+                         self.entries[:idx] + self.entries[idx+1:])
+        return _Node(self.bitmap,
+                     self.entries[:idx] + (new,) + self.entries[idx+1:])
+
+    def is_pair(self):
+        return len(self.entries) == 1 and type(self.entries[0]) is tuple
+    def pair(self): return self.entries[0]
+
+    def items(self):
+        for entry in self.entries:
+            if type(entry) is tuple: yield entry
+            else:
+                for item in entry.items(): yield item
+
+class _Collision(object):
+    # keys whose 32 bit hashes are all equal
+    __slots__ = ('hash', 'entries')
+    def __init__(self, h, entries):
+        self.hash = h
+        self.entries = entries
+
+    def get(self, h, shift, key, default):
+        for entry in self.entries:
+            if entry[0] == key: return entry[1]
+        return default
+
+    def entry(self, h, shift, key):
+        for entry in self.entries:
+            if entry[0] == key: return entry
+        return None
+
+    def assoc(self, h, shift, key, val, seq):
+        if h != self.hash:
+            node = _Node(_bitpos(self.hash, shift), (self,))
+            return node.assoc(h, shift, key, val, seq)
+        for i, (k, v, s) in enumerate(self.entries):
+            if k == key:
+                if v is val: return self, False
+                return (_Collision(h, self.entries[:i] + ((key, val, s),)
+                                      + self.entries[i+1:]),
+                        False)
+        return _Collision(h, self.entries + ((key, val, seq),)), True
+
+    def without(self, h, shift, key):
+        entries = tuple(e for e in self.entries if e[0] != key)
+        if len(entries) == len(self.entries): return self
+        return _Collision(h, entries) if entries else None
+
+    def is_pair(self): return len(self.entries) == 1
+    def pair(self): return self.entries[0]
+
+    def items(self): return iter(self.entries)
+
+def _hash(key): return hash(key) & _HASH_MASK
+
+def _split(entry1, h1, h2, shift, entry2):
+    if shift >= _HASH_BITS or h1 == h2:
+        return _Collision(h1, (entry1, entry2))
+    bit1, bit2 = _bitpos(h1, shift), _bitpos(h2, shift)
+    if bit1 == bit2:
+        return _Node(bit1, (_split(entry1, h1, h2, shift + 5, entry2),))
+    pairs = (entry1, entry2) if bit1 < bit2 else (entry2, entry1)
+    return _Node(bit1 | bit2, pairs)
+
+_EMPTY_NODE = _Node(0, ())
+
+class Hash_Map(object):
+    # _order[:_norder] are (key, value, seq) entries in insertion order.
+    # Like List, a map that assoc gives a new key shares the python list
+    # with its parent and appends to it when no other map has. Changing a
+    # value keeps a key's place, and dissoc leaves a dead entry behind, so
+    # neither copies the order. Until _exact is set again, passes over the
+    # map check the entries against the trie: one whose seq no longer
+    # matches is dead, and the value comes from the trie. Once dead
+    # entries outnumber live ones, dissoc compacts them away.
+    def __init__(self, *args, **kwargs):
+        self._root, self._count, self._seq = _EMPTY_NODE, 0, 0
+        self._order = []
+        for k, v in dict(*args, **kwargs).items():
+            self._root, added = self._root.assoc(_hash(k), 0, k, v, self._seq)
+            self._count += added
+            self._order.append((k, v, self._seq))
+            self._seq += 1
+        self._norder = len(self._order)
+        self._exact = True
+
+    def __reduce__(self):
+        # the trie is laid out by hash(), which differs between processes
+        # for strings, so a pickle holds the entries and rebuilds it
+        state = dict((k, v) for k, v in self.__dict__.items()
+                     if k not in ('_root', '_count', '_seq', '_order',
+                                  '_norder', '_exact'))
+        return Hash_Map, (list(self.items()),), state or None
+
+    def __copy__(self):
+        # shares the trie, where copy.copy would go through __reduce__
+        hm = Hash_Map.__new__(Hash_Map)
+        hm.__dict__.update(self.__dict__)
+        return hm
+
+    def _replace(self, root, count, seq, order, norder, exact):
+        # keeps any other attribute, such as __meta__
+        hm = copy.copy(self)
+        hm._root, hm._count, hm._seq = root, count, seq
+        hm._order, hm._norder, hm._exact = order, norder, exact
+        return hm
+
+    def assoc(self, key, val):
+        root, added = self._root.assoc(_hash(key), 0, key, val, self._seq)
+        if root is self._root: return self
+        order, norder = self._order, self._norder
+        if not added:
+            return self._replace(root, self._count, self._seq,
+                                 order, norder, False)
+        entry = (key, val, self._seq)
+        if len(order) == norder: order.append(entry)
+        else:                    order = order[:norder] + [entry]
+        return self._replace(root, self._count + 1, self._seq + 1,
+                             order, norder + 1, self._exact)
+
+    def dissoc(self, key):
+        root = self._root.without(_hash(key), 0, key)
+        if root is self._root: return self
+        hm = self._replace(root or _EMPTY_NODE, self._count - 1, self._seq,
+                           self._order, self._norder, False)
+        if hm._norder > 2 * hm._count + 8:
+            for entry in hm._live(): pass
+        return hm
+
+    _missing = object()
+    def get(self, key, default=None):
+        return self._root.get(_hash(key), 0, key, default)
+    def __getitem__(self, key):
+        val = self._root.get(_hash(key), 0, key, self._missing)
+        if val is self._missing: raise KeyError(key)
+        return val
+    def __contains__(self, key):
+        return self._root.get(_hash(key), 0, key, self._missing) is not self._missing
+    def __len__(self): return self._count
+    def _ordered(self):
+        if self._exact:
+            return islice(self._order, self._norder)
+        return self._live()
+    def _live(self):
+        # The first entries are looked up one by one, so taking the first
+        # key stays cheap. A pass that goes on walks the trie once instead,
+        # and one that finishes keeps its order for the next pass.
+        root, order, entries = self._root, [], None
+        for i, (k, v, s) in enumerate(islice(self._order, self._norder)):
+            if entries is not None:
+                entry = entries.get(k)
+            elif i < 32:
+                entry = root.entry(_hash(k), 0, k)
+            else:
+                entries = dict((e[0], e) for e in root.items())
+                entry = entries.get(k)
+            if entry is not None and entry[2] == s:
+                order.append(entry)
+                yield entry
+        self._order, self._norder, self._exact = order, len(order), True
+    def __iter__(self):
+        for k, v, s in self._ordered(): yield k
+    def items(self):
+        for k, v, s in self._ordered(): yield k, v
+    def keys(self): return iter(self)
+    def values(self):
+        for k, v, s in self._ordered(): yield v
+    def __eq__(self, other):
+        if not isinstance(other, Hash_Map) or len(self) != len(other):
+            return False
+        for k, v, s in self._root.items():
+            if other.get(k, self._missing) != v: return False
+        return True
+    def __ne__(self, other): return not self == other
+    __hash__ = None
+
 def _hash_map(*key_vals):
     hm = Hash_Map()
-    for i in range(0,len(key_vals),2): hm[key_vals[i]] = key_vals[i+1]
+    for i in range(0,len(key_vals),2): hm = hm.assoc(key_vals[i], key_vals[i+1])
     return hm
 def _hash_map_Q(exp): return type(exp) == Hash_Map
 
@@ -140,6 +485,14 @@ class Atom(object):
 def _atom(val): return Atom(val)
 def _atom_Q(exp):   return type(exp) == Atom
 
+# reduced: wraps the accumulator to stop a reduce early
+class Reduced(object):
+    __slots__ = ('val',)
+    def __init__(self, val):
+        self.val = val
+def _reduced(val): return Reduced(val)
+def _reduced_Q(exp): return type(exp) == Reduced
+
 def py_to_mal(obj):
         if type(obj) == list:   return List(obj)
         if type(obj) == tuple:  return List(obj)
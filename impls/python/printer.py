@@ -1,34 +1,72 @@
 import mal_types as types
 
+_KEYWORD_PREFIX = types._u('\u029e')
+
 def _escape(s):
     return s.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
-def _pr_str(obj, print_readably=True):
+def _seq_items(seq, write):
+    it = iter(seq)
+    for e in it:
+        yield e
+        break
+    for e in it:
+        write(" ")
+        yield e
+
+def _hash_map_items(obj, write):
+    # keys are always printed readably
+    sep = ""
+    for k in obj.keys():
+        write(sep)
+        _pr_to(k, write)
+        write(" ")
+        sep = " "
+        yield obj[k]
+
+def _pr_to(obj, write, print_readably=True):
+    # Containers push an (items, closer, print_readably) frame instead of
+    # recursing, so the nesting depth is not bound by the recursion limit.
     _r = print_readably
-    if types._list_Q(obj):
-        return "(" + " ".join(map(lambda e: _pr_str(e,_r), obj)) + ")"
-    elif types._vector_Q(obj):                                    
-        return "[" + " ".join(map(lambda e: _pr_str(e,_r), obj)) + "]"
-    elif types._hash_map_Q(obj):
-        ret = []
-        for k in obj.keys():
-            ret.extend((_pr_str(k), _pr_str(obj[k],_r)))
-        return "{" + " ".join(ret) + "}"
-    elif type(obj) in types.str_types:
-        if len(obj) > 0 and obj[0] == types._u('\u029e'):
-            return ':' + obj[1:]
-        elif print_readably:
-            return '"' + _escape(obj) + '"'
+    stack = []
+    while True:
+        if type(obj) in types.str_types:
+            if len(obj) > 0 and obj[0] == _KEYWORD_PREFIX:
+                write(':' + obj[1:])
+            elif _r:
+                write('"' + _escape(obj) + '"')
+            else:
+                write(obj)
+        elif types._list_Q(obj):
+            write("(")
+            stack.append((_seq_items(obj, write), ")", _r))
+        elif types._vector_Q(obj):
+            write("[")
+            stack.append((_seq_items(obj, write), "]", _r))
+        elif types._hash_map_Q(obj):
+            write("{")
+            stack.append((_hash_map_items(obj, write), "}", _r))
+        elif types._nil_Q(obj):
+            write("nil")
+        elif types._true_Q(obj):
+            write("true")
+        elif types._false_Q(obj):
+            write("false")
+        elif types._atom_Q(obj):
+            write("(atom ")
+            stack.append((iter((obj.val,)), ")", _r))
+        else:
+            write(obj.__str__())
+        while stack:
+            items, closer, _r = stack[-1]
+            obj = next(items, stack)
+            if obj is not stack: break
+            write(closer)
+            stack.pop()
         else:
-            return obj
-    elif types._nil_Q(obj):
-        return "nil"
-    elif types._true_Q(obj):
-        return "true"
-    elif types._false_Q(obj):
-        return "false"
-    elif types._atom_Q(obj):
-        return "(atom " + _pr_str(obj.val,_r) + ")"
-    else:
-        return obj.__str__()
+            return
 
+def _pr_str(obj, print_readably=True):
+    chunks = []
+    _pr_to(obj, chunks.append, print_readably)
+    return "".join(chunks)
@@ -1,74 +1,104 @@
 import re
-from mal_types import (_symbol, _keyword, _list, _vector, _hash_map, _s2u, _u)
+from mal_types import (_symbol, _keyword, _list, List, Vector, _hash_map, _s2u, _u)
 
 class Blank(Exception): pass
 
 class Reader():
-    def __init__(self, tokens, position=0):
-        self.tokens = tokens
-        self.position = position
+    """Reads forms from an iterator of (kind, token) pairs, which is
+    consumed one token at a time."""
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+        self.token = next(self.tokens, None)
 
     def next(self):
-        self.position += 1
-        return self.tokens[self.position-1]
+        token = self.token
+        self.token = next(self.tokens, None)
+        return token
 
     def peek(self):
-        if len(self.tokens) > self.position:
-            return self.tokens[self.position]
-        else:
-            return None
+        return self.token
+
+# One token, classified by the name of the group that matched it. A number
+# must end where a symbol would, so 1abc is read as a symbol.
+_atom_chars = r"""[^\s\[\]{}()'"`@,;]"""
+token_re = re.compile(
+    r"""[\s,]*(?:(?P<comment>;.*)|(?P<delimiter>~@|[\[\]{}()'`~^@])"""
+    r"""|(?P<string>"(?:[\\].|[^\\"])*")|(?P<unterminated>"(?:[\\].|[^\\"])*)"""
+    r"""|(?P<number>-?[0-9][0-9.]*)(?!""" + _atom_chars + r""")"""
+    r"""|(?P<keyword>:""" + _atom_chars + r"""*)|(?P<symbol>""" + _atom_chars + r"""+))""")
 
 def tokenize(str):
-    tre = re.compile(r"""[\s,]*(~@|[\[\]{}()'`~^@]|"(?:[\\].|[^\\"])*"?|;.*|[^\s\[\]{}()'"`@,;]+)""");
-    return [t for t in re.findall(tre, str) if t[0] != ';']
+    """Yield the (kind, token) pairs of str, without comments."""
+    pos = 0
+    while True:
+        m = token_re.match(str, pos)
+        if m is None: return
+        pos = m.end()
+        if m.lastgroup != 'comment':
+            yield m.lastgroup, m.group(m.lastgroup)
+
+def tokenize_file(f, chunk_size=65536):
+    """Like tokenize, but reads the file object f chunk_size characters at
+    a time. Only the chunk and a token split across chunks are kept."""
+    buf, pos, eof = '', 0, False
+    while True:
+        m = token_re.match(buf, pos)
+        # a token that reaches the end of the buffer, or a string whose
+        # closing quote is not in it yet, may continue in the next chunk
+        if not eof and (m is None or m.end() == len(buf)
+                        or m.lastgroup == 'unterminated'):
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        if m is None: return
+        pos = m.end()
+        if m.lastgroup != 'comment':
+            yield m.lastgroup, m.group(m.lastgroup)
 
 def _unescape(s):
     return s.replace('\\\\', _u('\u029e')).replace('\\"', '"').replace('\\n', '\n').replace(_u('\u029e'), '\\')
 
 def read_atom(reader):
-    int_re = re.compile(r"-?[0-9]+$")
-    float_re = re.compile(r"-?[0-9][0-9.]*$")
-    string_re = re.compile(r'"(?:[\\].|[^\\"])*"')
-    token = reader.next()
-    if re.match(int_re, token):     return int(token)
-    elif re.match(float_re, token): return int(token)
-    elif re.match(string_re, token):return _s2u(_unescape(token[1:-1]))
-    elif token[0] == '"':           raise Exception("expected '\"', got EOF")
-    elif token[0] == ':':           return _keyword(token[1:])
+    kind, token = reader.next()
+    if kind == 'number':            return int(token)
+    elif kind == 'string':          return _s2u(_unescape(token[1:-1]))
+    elif kind == 'unterminated':    raise Exception("expected '\"', got EOF")
+    elif kind == 'keyword':         return _keyword(token[1:])
     elif token == "nil":            return None
     elif token == "true":           return True
     elif token == "false":          return False
     else:                           return _symbol(token)
 
 def read_sequence(reader, typ=list, start='(', end=')'):
-    ast = typ()
-    token = reader.next()
+    ast = []
+    kind, token = reader.next()
     if token != start: raise Exception("expected '" + start + "'")
 
     token = reader.peek()
-    while token != end:
+    while token != ('delimiter', end):
         if not token: raise Exception("expected '" + end + "', got EOF")
         ast.append(read_form(reader))
         token = reader.peek()
     reader.next()
-    return ast
+    return typ(ast)
 
 def read_hash_map(reader):
     lst = read_sequence(reader, list, '{', '}')
     return _hash_map(*lst)
 
 def read_list(reader):
-    return read_sequence(reader, _list, '(', ')')
+    return read_sequence(reader, List, '(', ')')
 
 def read_vector(reader):
-    return read_sequence(reader, _vector, '[', ']')
+    return read_sequence(reader, Vector, '[', ']')
 
 def read_form(reader):
-    token = reader.peek()
+    if reader.peek() is None: raise Exception("expected a form, got EOF")
+    kind, token = reader.peek()
     # reader macros/transforms
-    if token[0] == ';':
-        reader.next()
-        return None
+    if kind != 'delimiter':
+        return read_atom(reader)
     elif token == '\'':
         reader.next()
         return _list(_symbol('quote'), read_form(reader))
@@ -101,10 +131,14 @@ def read_form(reader):
     elif token == '}': raise Exception("unexpected '}'");
     elif token == '{': return read_hash_map(reader);
 
-    # atom
-    else:              return read_atom(reader);
-
 def read_str(str):
-    tokens = tokenize(str)
-    if len(tokens) == 0: raise Blank("Blank Line")
-    return read_form(Reader(tokens))
+    reader = Reader(tokenize(str))
+    if reader.peek() is None: raise Blank("Blank Line")
+    return read_form(reader)
+
+def read_file(f):
+    """Yield the forms in the file object f one at a time, so only the
+    form being read is held in memory."""
+    reader = Reader(tokenize_file(f))
+    while reader.peek() is not None:
+        yield read_form(reader)
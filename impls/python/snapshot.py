@@ -0,0 +1,84 @@
+# Save a repl environment to a file and load it back (python 3 only).
+#
+# A mal function is a closure over its analyzed body, so it is written as
+# its ast, params and env and analyzed again on load. Builtins, the core.ns
+# functions and the few stepA adds, are written by name.
+
+import pickle
+
+VERSION = 1
+
+def _function(ast, params, env):
+    # stands in for the make_function passed to load
+    raise pickle.UnpicklingError("mal function outside of snapshot.load")
+
+_FN_STATE = ('__meta__', '_ismacro_')
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, f, natives):
+        pickle.Pickler.__init__(self, f, pickle.HIGHEST_PROTOCOL)
+        self.names = dict((id(v), k) for k, v in natives.items())
+
+    def persistent_id(self, obj):
+        if id(obj) in self.names:
+            return self.names[id(obj)]
+        return None
+
+    def reducer_override(self, obj):
+        if callable(obj) and hasattr(obj, '__ast__'):
+            state = dict((k, v) for k, v in obj.__dict__.items() if k in _FN_STATE)
+            return _function, (obj.__ast__, obj.__params__, obj.__env__), state
+        return NotImplemented
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, f, natives, make_function):
+        pickle.Unpickler.__init__(self, f)
+        self.natives = natives
+        self.make_function = make_function
+
+    def persistent_load(self, pid):
+        return self.natives[pid]
+
+    def find_class(self, module, name):
+        if module == __name__ and name == '_function':
+            return self.make_function
+        return pickle.Unpickler.find_class(self, module, name)
+
+def save(path, env, natives):
+    """Write env to path. natives maps a name to each builtin function
+    env may hold."""
+    try:
+        data = _dumps(env, natives)
+    except (pickle.PicklingError, TypeError, AttributeError) as e:
+        raise Exception("cannot snapshot %s: %s" % (_culprit(env, natives), e))
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def load(path, natives, make_function):
+    """Read back the env saved to path. make_function(ast, params, env)
+    rebuilds a mal function."""
+    with open(path, 'rb') as f:
+        version = pickle.load(f)
+        if version != VERSION:
+            raise Exception("%s: snapshot version %r, expected %r"
+                            % (path, version, VERSION))
+        return _Unpickler(f, natives, make_function).load()
+
+def _dumps(obj, natives):
+    import io
+    f = io.BytesIO()
+    pickle.dump(VERSION, f)
+    _Pickler(f, natives).dump(obj)
+    return f.getvalue()
+
+def _culprit(env, natives):
+    # name the first binding that cannot be written on its own, with env
+    # itself left out so that one bad binding does not taint the others
+    natives = dict(natives)
+    natives[''] = env
+    for k, v in env.data.items():
+        try:
+            _dumps(v, natives)
+        except Exception:
+            return "'" + k + "'"
+    return "the environment"
@@ -1,4 +1,4 @@
-import sys, traceback
+import sys, traceback, os, atexit
 import mal_readline
 import mal_types as types
 import reader, printer
@@ -40,130 +40,293 @@ def macroexpand(ast, env):
         ast = mac(*ast[1:])
     return ast
 
-def eval_ast(ast, env):
+# analyze: turn a form into a closure taking an env, once, so that
+# repeated evaluation skips special form dispatch.  Closures analyzed in
+# tail position return a TailCall instead of growing the python stack.
+TailCall, execute = types.TailCall, types.execute
+
+def _function(body, ast, env, params):
+    Env.closures += 1
+    fn = types._function(lambda _, fn_env: execute(body, fn_env),
+                         Env, ast, env, params)
+    fn.__body__ = body
+    return fn
+
+def analyze_def(ast, tail):
+    a1, a2 = ast[1], analyze(ast[2])
+    return lambda env: env.set(a1, a2(env))
+
+def analyze_let(ast, tail):
+    a1, body = ast[1], analyze(ast[2], tail)
+    binds = [(a1[i], analyze(a1[i+1])) for i in range(0, len(a1), 2)]
+    def let(env):
+        let_env = Env(env)
+        for k, v in binds:
+            let_env.bind(k, v(let_env))
+        return body(let_env)
+    return let
+
+def analyze_quote(ast, tail):
+    a1 = ast[1]
+    return lambda env: a1
+
+def analyze_quasiquote(ast, tail):
+    return analyze(quasiquote(ast[1]), tail)
+
+def analyze_defmacro(ast, tail):
+    a1, a2 = ast[1], analyze(ast[2])
+    def defmacro(env):
+        func = types._clone(a2(env))
+        func._ismacro_ = True
+        return env.set(a1, func)
+    return defmacro
+
+def analyze_macroexpand(ast, tail):
+    a1 = ast[1]
+    return lambda env: macroexpand(a1, env)
+
+def analyze_py_stmt(ast, tail):
+    code = compile(ast[1], '', 'single')
+    def py_stmt(env):
+        exec(code, globals())
+        return None
+    return py_stmt
+
+def analyze_py_expr(ast, tail):
+    code = compile(ast[1], '', 'eval')
+    return lambda env: types.py_to_mal(eval(code))
+
+def analyze_dot(ast, tail):
+    a1, args = ast[1], [analyze(a) for a in ast[2:]]
+    return lambda env: eval(a1)(*[a(env) for a in args])
+
+def analyze_try(ast, tail):
+    if len(ast) < 3:
+        return analyze(ast[1], tail)
+    a1, a2 = analyze(ast[1]), ast[2]
+    if a2[0] != "catch*":
+        return a1
+    binds, handler = [a2[1]], analyze(a2[2], tail)
+    def try_(env):
+        try:
+            return a1(env)
+        except types.MalException as exc:
+            err = exc.object
+        except Exception as exc:
+            err = exc.args[0]
+        return handler(Env(env, binds, [err]))
+    return try_
+
+def analyze_do(ast, tail):
+    exprs, last = [analyze(a) for a in ast[1:-1]], analyze(ast[-1], tail)
+    def do(env):
+        for e in exprs:
+            e(env)
+        return last(env)
+    return do
+
+def analyze_if(ast, tail):
+    cond, then = analyze(ast[1]), analyze(ast[2], tail)
+    if len(ast) > 3: else_ = analyze(ast[3], tail)
+    else:            else_ = lambda env: None
+    def if_(env):
+        c = cond(env)
+        if c is None or c is False:
+            return else_(env)
+        return then(env)
+    return if_
+
+def analyze_fn(ast, tail):
+    a1, a2 = ast[1], ast[2]
+    body = analyze(a2, True)
+    return lambda env: _function(body, a2, env, a1)
+
+def analyze_symbol(ast):
+    # inline cache: a symbol that resolved to repl_env keeps its value
+    # until repl_env's version changes
+    cache = [None, -1, None]  # root env, version, value
+    def symbol(env):
+        root = env.root
+        if cache[1] == root.version and cache[0] is root:
+            return cache[2]
+        found = env.find(ast)
+        if not found: raise Exception("'" + ast + "' not found")
+        value = found.data[ast]
+        if found is root:
+            cache[0], cache[1], cache[2] = root, root.version, value
+        return value
+    return symbol
+
+# hits and misses of the per call site macro expansion caches
+expansion_stats = [0, 0]
+
+def report_expansion_stats():
+    hits, misses = expansion_stats
+    total = hits + misses
+    rate = 100.0 * hits / total if total else 0.0
+    sys.stderr.write("macro expansion cache: %d hits, %d misses (%.1f%%)\n"
+                     % (hits, misses, rate))
+
+def analyze_call(ast, tail):
+    a0 = ast[0]
+    f_node, maybe_macro = analyze(a0), types._symbol_Q(a0)
+    state = [None]  # arguments are analyzed once we know a0 isn't a macro
+    # the expansion is analyzed once per macro object; defmacro! binds a
+    # new one, so redefining the macro invalidates it
+    expansion = [None, None]  # macro, analyzed expansion
+    def call(env):
+        f = f_node(env)
+        if maybe_macro and hasattr(f, '_ismacro_'):
+            if expansion[0] is f:
+                expansion_stats[0] += 1
+            else:
+                expansion_stats[1] += 1
+                expansion[0], expansion[1] = f, analyze(f(*ast[1:]), tail)
+            return expansion[1](env)
+        args = state[0]
+        if args is None:
+            args = state[0] = [analyze(a) for a in ast[1:]]
+        # a loop rather than a comprehension, which is one more python
+        # frame on every nested call before python 3.12
+        vals = []
+        for a in args: vals.append(a(env))
+        body = getattr(f, '__body__', None)
+        if body is None:
+            return f(*vals)
+        el = types.List.from_owned(vals)
+        if tail:
+            return TailCall(body, f.__gen_env__(el))
+        # inlined execute() keeps one python frame per mal call
+        res = body(f.__gen_env__(el))
+        while type(res) is TailCall:
+            res = res.body(res.env)
+        return res
+    return call
+
+special_forms = {
+    "def!": analyze_def,
+    "let*": analyze_let,
+    "quote": analyze_quote,
+    "quasiquote": analyze_quasiquote,
+    "defmacro!": analyze_defmacro,
+    "macroexpand": analyze_macroexpand,
+    "py!*": analyze_py_stmt,
+    "py*": analyze_py_expr,
+    ".": analyze_dot,
+    "try*": analyze_try,
+    "do": analyze_do,
+    "if": analyze_if,
+    "fn*": analyze_fn,
+}
+
+def analyze(ast, tail=False):
     if types._symbol_Q(ast):
-        return env.get(ast)
+        return analyze_symbol(ast)
     elif types._list_Q(ast):
-        return types._list(*map(lambda a: EVAL(a, env), ast))
+        if len(ast) == 0: return lambda env: ast
+        a0 = ast[0]
+        if types._symbol_Q(a0) and a0 in special_forms:
+            return special_forms[a0](ast, tail)
+        return analyze_call(ast, tail)
     elif types._vector_Q(ast):
-        return types._vector(*map(lambda a: EVAL(a, env), ast))
+        items = [analyze(a) for a in ast]
+        def vector(env):
+            vals = []
+            for i in items: vals.append(i(env))
+            return types._vector(*vals)
+        return vector
     elif types._hash_map_Q(ast):
-        keyvals = []
-        for k in ast.keys():
-            keyvals.append(EVAL(k, env))
-            keyvals.append(EVAL(ast[k], env))
-        return types._hash_map(*keyvals)
+        items = [(analyze(k), analyze(v)) for k, v in ast.items()]
+        def hash_map(env):
+            keyvals = []
+            for k, v in items:
+                keyvals.append(k(env))
+                keyvals.append(v(env))
+            return types._hash_map(*keyvals)
+        return hash_map
     else:
-        return ast  # primitive value, return unchanged
+        return lambda env: ast  # primitive value, return unchanged
 
 def EVAL(ast, env):
-    while True:
-        #print("EVAL %s" % printer._pr_str(ast))
-        if not types._list_Q(ast):
-            return eval_ast(ast, env)
-
-        # apply list
-        ast = macroexpand(ast, env)
-        if not types._list_Q(ast):
-            return eval_ast(ast, env)
-        if len(ast) == 0: return ast
-        a0 = ast[0]
+    return execute(analyze(ast, True), env)
 
-        if "def!" == a0:
-            a1, a2 = ast[1], ast[2]
-            res = EVAL(a2, env)
-            return env.set(a1, res)
-        elif "let*" == a0:
-            a1, a2 = ast[1], ast[2]
-            let_env = Env(env)
-            for i in range(0, len(a1), 2):
-                let_env.set(a1[i], EVAL(a1[i+1], let_env))
-            ast = a2
-            env = let_env
-            # Continue loop (TCO)
-        elif "quote" == a0:
-            return ast[1]
-        elif "quasiquote" == a0:
-            ast = quasiquote(ast[1]);
-            # Continue loop (TCO)
-        elif 'defmacro!' == a0:
-            func = types._clone(EVAL(ast[2], env))
-            func._ismacro_ = True
-            return env.set(ast[1], func)
-        elif 'macroexpand' == a0:
-            return macroexpand(ast[1], env)
-        elif "py!*" == a0:
-            exec(compile(ast[1], '', 'single'), globals())
-            return None
-        elif "py*" == a0:
-            return types.py_to_mal(eval(ast[1]))
-        elif "." == a0:
-            el = eval_ast(ast[2:], env)
-            f = eval(ast[1])
-            return f(*el)
-        elif "try*" == a0:
-            if len(ast) < 3:
-                return EVAL(ast[1], env)
-            a1, a2 = ast[1], ast[2]
-            if a2[0] == "catch*":
-                err = None
-                try:
-                    return EVAL(a1, env)
-                except types.MalException as exc:
-                    err = exc.object
-                except Exception as exc:
-                    err = exc.args[0]
-                catch_env = Env(env, [a2[1]], [err])
-                return EVAL(a2[2], catch_env)
-            else:
-                return EVAL(a1, env);
-        elif "do" == a0:
-            eval_ast(ast[1:-1], env)
-            ast = ast[-1]
-            # Continue loop (TCO)
-        elif "if" == a0:
-            a1, a2 = ast[1], ast[2]
-            cond = EVAL(a1, env)
-            if cond is None or cond is False:
-                if len(ast) > 3: ast = ast[3]
-                else:            ast = None
-            else:
-                ast = a2
-            # Continue loop (TCO)
-        elif "fn*" == a0:
-            a1, a2 = ast[1], ast[2]
-            return types._function(EVAL, Env, a2, env, a1)
-        else:
-            el = eval_ast(ast, env)
-            f = el[0]
-            if hasattr(f, '__ast__'):
-                ast = f.__ast__
-                env = f.__gen_env__(el[1:])
-            else:
-                return f(*el[1:])
+def load_file(path):
+    """Evaluate the forms of the file at path as each one is read. An
+    error is tagged with the form it came from, in form_location."""
+    with open(path) as f:
+        forms = reader.read_file(f)
+        n = 0
+        while True:
+            n += 1
+            try:
+                form = next(forms)
+            except StopIteration:
+                return None
+            except Exception as exc:
+                _locate(exc, "reading form %d of %s" % (n, path))
+                raise
+            try:
+                EVAL(form, repl_env)
+            except Exception as exc:
+                _locate(exc, "in form %d of %s: %s" % (n, path, printer._pr_str(form)[:80]))
+                raise
+
+def _locate(exc, location):
+    # a nested load-file has already named the innermost form
+    if not hasattr(exc, 'form_location'):
+        exc.form_location = location
 
 # print
 def PRINT(exp):
     return printer._pr_str(exp)
 
 # repl
+if os.environ.get('MAL_EXPANSION_STATS'):
+    atexit.register(report_expansion_stats)
+
 repl_env = Env()
 def REP(str):
     return PRINT(EVAL(READ(str), repl_env))
 
-# core.py: defined using python
-for k, v in core.ns.items(): repl_env.set(types._symbol(k), v)
-repl_env.set(types._symbol('eval'), lambda ast: EVAL(ast, repl_env))
-repl_env.set(types._symbol('*ARGV*'), types._list(*sys.argv[2:]))
+# the builtins, by the names a snapshot refers to them by
+natives = dict(core.ns)
+natives['eval'] = lambda ast: EVAL(ast, repl_env)
+natives['load-file'] = load_file
+
+def make_function(ast, params, env):
+    return _function(analyze(ast, True), ast, env, params)
+
+# --snapshot FILE starts from an environment saved by --save-snapshot
+if len(sys.argv) >= 3 and sys.argv[1] == '--snapshot':
+    import snapshot
+    repl_env = snapshot.load(sys.argv[2], natives, make_function)
+    del sys.argv[1:3]
+else:
+    # core.py: defined using python
+    for k, v in natives.items(): repl_env.set(types._symbol(k), v)
 
-# core.mal: defined using the language itself
-REP("(def! *host-language* \"python\")")
-REP("(def! not (fn* (a) (if a false true)))")
-REP("(def! load-file (fn* (f) (eval (read-string (str \"(do \" (slurp f) \"\nnil)\")))))")
-REP("(defmacro! cond (fn* (& xs) (if (> (count xs) 0) (list 'if (first xs) (if (> (count xs) 1) (nth xs 1) (throw \"odd number of forms to cond\")) (cons 'cond (rest (rest xs)))))))")
+    # core.mal: defined using the language itself
+    REP("(def! *host-language* \"python\")")
+    REP("(def! not (fn* (a) (if a false true)))")
+    REP("(defmacro! cond (fn* (& xs) (if (> (count xs) 0) (list 'if (first xs) (if (> (count xs) 1) (nth xs 1) (throw \"odd number of forms to cond\")) (cons 'cond (rest (rest xs)))))))")
+
+# --save-snapshot FILE [LIB...] loads the libraries and saves the result
+if len(sys.argv) >= 3 and sys.argv[1] == '--save-snapshot':
+    import snapshot
+    for lib in sys.argv[3:]: load_file(lib)
+    repl_env.set(types._symbol('*ARGV*'), types._list())
+    snapshot.save(sys.argv[2], repl_env, natives)
+    sys.exit(0)
+
+repl_env.set(types._symbol('*ARGV*'), types._list(*sys.argv[2:]))
 
 if len(sys.argv) >= 2:
-    REP('(load-file "' + sys.argv[1] + '")')
+    try:
+        load_file(sys.argv[1])
+    except Exception as e:
+        if hasattr(e, 'form_location'):
+            sys.stderr.write("Error " + e.form_location + "\n")
+        raise
     sys.exit(0)
 
 # repl loop
@@ -177,5 +340,7 @@ while True:
     except reader.Blank: continue
     except types.MalException as e:
         print("Error:", printer._pr_str(e.object))
+        if hasattr(e, 'form_location'): print("  " + e.form_location)
     except Exception as e:
         print("".join(traceback.format_exception(*sys.exc_info())))
+        if hasattr(e, 'form_location'): print("  " + e.form_location)
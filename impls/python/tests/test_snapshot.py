@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+STEPA = os.path.join(os.path.dirname(TESTS), 'stepA_mal.py')
+
+
+class TestSnapshot(unittest.TestCase):
+    def run_mal(self, seed, args):
+        # a different hash seed in each process, so hash-maps are rebuilt
+        # rather than trusted to keep their layout
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        return subprocess.check_output([sys.executable, STEPA] + args, env=env)
+
+    def test_snapshot_roundtrip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            snap = os.path.join(directory, 'snap')
+            self.run_mal('1', ['--save-snapshot', snap,
+                               os.path.join(TESTS, 'snapshot_lib.mal')])
+            out = self.run_mal('2', ['--snapshot', snap,
+                                     os.path.join(TESTS, 'snapshot_use.mal')])
+        self.assertEqual(b'{:k 1} [2 {:c 3}] 5\n', out)
+
+
+if __name__ == '__main__':
+    unittest.main()